@@ -1,21 +1,26 @@
-from flask import Flask, send_from_directory
+from flask import Flask, Response, abort, send_from_directory
+from werkzeug.security import safe_join
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from datetime import timedelta
+import mimetypes
 import os
 from dotenv import load_dotenv
 
-# Initialize SQLAlchemy
-db = SQLAlchemy()
+# Initialize SQLAlchemy; the session routes read-only requests to replicas when configured
+from .utils.replicas import RoutingSession, replica_bind_keys
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 def create_app():
     # Load environment variables
     load_dotenv()
 
     # Initialize Flask app
+    from .utils.upload import UploadRequest, IMMUTABLE_CACHE_CONTROL
     app = Flask(__name__)
+    app.request_class = UploadRequest
 
     # Configure CORS
     CORS(app, 
@@ -32,22 +37,106 @@ def create_app():
     # Configure database
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'postgresql://localhost/cooking_half')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['DB_POOL_SIZE'] = int(os.getenv('DB_POOL_SIZE', 5))
+    app.config['DB_MAX_OVERFLOW'] = int(os.getenv('DB_MAX_OVERFLOW', 10))
+    app.config['DB_POOL_TIMEOUT'] = int(os.getenv('DB_POOL_TIMEOUT', 10))  # Seconds to wait for a free connection
+    app.config['DB_POOL_RECYCLE'] = int(os.getenv('DB_POOL_RECYCLE', 1800))  # Seconds before a connection is replaced
+    app.config['DB_POOL_PRE_PING'] = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    app.config['DB_POOLER'] = os.getenv('DB_POOLER', '')  # 'pgbouncer' to leave pooling to an external pooler
+    app.config['DB_STATEMENT_TIMEOUT'] = int(os.getenv('DB_STATEMENT_TIMEOUT', 30000))  # Milliseconds per request statement, 0 to disable
+    app.config['INTERNAL_API_TOKEN'] = os.getenv('INTERNAL_API_TOKEN')
+
+    # Configure read replicas (comma-separated URLs; GET requests are spread across them)
+    replica_urls = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    app.config['REPLICA_CONNECT_TIMEOUT'] = int(os.getenv('REPLICA_CONNECT_TIMEOUT', 2))  # Seconds, PostgreSQL replicas
+    app.config['REPLICA_STICKY_SECONDS'] = int(os.getenv('REPLICA_STICKY_SECONDS', 5))  # Reads from the primary after a user's write
+    app.config['REPLICA_HEALTH_CHECK_INTERVAL'] = int(os.getenv('REPLICA_HEALTH_CHECK_INTERVAL', 30))
 
     # Configure JWT
     app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'your-secret-key')  # Change in production
     app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=1)
     
+    # Configure password hashing (werkzeug method string, e.g. scrypt:32768:8:1 or pbkdf2:sha256:600000)
+    app.config['PASSWORD_HASH_METHOD'] = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    app.config['PASSWORD_HASH_CONCURRENCY'] = int(os.getenv('PASSWORD_HASH_CONCURRENCY', 0)) or None
+    
     # Configure file uploads
     app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
     app.config['UPLOAD_FOLDER'] = os.path.join(os.getcwd(), 'uploads')
+    app.config['UPLOAD_SERVE_MODE'] = os.getenv('UPLOAD_SERVE_MODE', 'direct')  # direct, x-sendfile or x-accel-redirect
+    app.config['UPLOAD_ACCEL_PREFIX'] = os.getenv('UPLOAD_ACCEL_PREFIX', '/internal-uploads/')
+    app.config['USE_X_SENDFILE'] = app.config['UPLOAD_SERVE_MODE'] == 'x-sendfile'
+    app.config['UPLOAD_SPOOL_THRESHOLD'] = int(os.getenv('UPLOAD_SPOOL_THRESHOLD', 64 * 1024))  # Bytes kept in memory per uploaded file
+    
+    app.config['STORAGE_BACKEND'] = 's3' if os.getenv('USE_S3', 'false').lower() == 'true' else 'local'
+    app.config['AWS_S3_BUCKET'] = os.getenv('AWS_S3_BUCKET')
+    app.config['AWS_S3_ENDPOINT_URL'] = os.getenv('AWS_S3_ENDPOINT_URL')  # S3-compatible servers
+    app.config['S3_MAX_POOL_CONNECTIONS'] = int(os.getenv('S3_MAX_POOL_CONNECTIONS', 20))
+    app.config['S3_MULTIPART_THRESHOLD'] = int(os.getenv('S3_MULTIPART_THRESHOLD', 8 * 1024 * 1024))
+    app.config['S3_MAX_CONCURRENCY'] = int(os.getenv('S3_MAX_CONCURRENCY', 4))
+    app.config['IMAGE_WORKERS'] = int(os.getenv('IMAGE_WORKERS', 2))
+    app.config['IMAGE_PROCESSING_ASYNC'] = os.getenv('IMAGE_PROCESSING_ASYNC', 'true').lower() == 'true'
     
     # Ensure upload directory exists
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+    # Configure response cache ('memory' or 'redis')
+    app.config['CACHE_BACKEND'] = os.getenv('CACHE_BACKEND', 'memory')
+    app.config['CACHE_REDIS_URL'] = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    app.config['CACHE_DEFAULT_TTL'] = int(os.getenv('CACHE_DEFAULT_TTL', 300))
+    app.config['CACHE_MAX_ENTRIES'] = int(os.getenv('CACHE_MAX_ENTRIES', 1024))
+    # Per-recipe entries are invalidated on write, but only in the writing process with the memory backend
+    app.config['CACHE_RECIPE_TTL'] = int(os.getenv(
+        'CACHE_RECIPE_TTL', app.config['CACHE_DEFAULT_TTL'] if app.config['CACHE_BACKEND'] == 'redis' else 10
+    ))
+    # Likewise for categories, ingredients and dietary restrictions, which change rarely
+    app.config['CACHE_LOOKUP_TTL'] = int(os.getenv(
+        'CACHE_LOOKUP_TTL', 3600 if app.config['CACHE_BACKEND'] == 'redis' else 30
+    ))
+
+    # Seconds between background rebuilds of the in-memory ingredient, facet and search indexes, which pick up other processes' writes
+    app.config['INGREDIENT_INDEX_TTL'] = int(os.getenv('INGREDIENT_INDEX_TTL', 60))
+    app.config['FACET_INDEX_TTL'] = int(os.getenv('FACET_INDEX_TTL', 60))
+    app.config['SEARCH_INDEX_TTL'] = int(os.getenv('SEARCH_INDEX_TTL', 60))  # Fallback search index, used without PostgreSQL
+    app.config['INDEX_REFRESH_ASYNC'] = os.getenv('INDEX_REFRESH_ASYNC', 'true').lower() == 'true'
+
+    # Configure ranked feeds (trending half-life in hours, top-rated prior in virtual ratings)
+    app.config['FEED_REFRESH_INTERVAL'] = int(os.getenv('FEED_REFRESH_INTERVAL', 300))
+    app.config['FEED_REFRESH_ASYNC'] = os.getenv('FEED_REFRESH_ASYNC', 'true').lower() == 'true'
+    app.config['FEED_TRENDING_HALF_LIFE'] = float(os.getenv('FEED_TRENDING_HALF_LIFE', 24))
+    app.config['FEED_RATING_PRIOR'] = float(os.getenv('FEED_RATING_PRIOR', 5))
+
+    # Configure JSON encoding ('orjson', falling back to 'stdlib' when not installed)
+    app.config['JSON_PROVIDER'] = os.getenv('JSON_PROVIDER', 'orjson')
+
     # Initialize extensions
+    from .utils.cache import init_cache
+    from .utils.passwords import init_password_hasher
+    from .utils.image_jobs import init_image_processor
+    from .utils.upload import init_storage
+    from .utils.feeds import init_feeds
+    from .utils.ingredient_index import init_ingredient_index
+    from .utils.facets import init_facet_index
+    from .utils.search import init_search_index
+    from .utils.json_provider import init_json_provider
+    from .utils.db_pool import build_engine_options, init_pool_metrics
+    from .utils.replicas import init_replicas
+    init_json_provider(app)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = build_engine_options(app.config)
+    app.config['SQLALCHEMY_BINDS'] = replica_bind_keys(replica_urls, app.config)
     db.init_app(app)
+    init_pool_metrics(app)
+    init_replicas(app, db)
     Migrate(app, db)
     JWTManager(app)
+    init_cache(app)
+    init_password_hasher(app)
+    init_storage(app)
+    init_image_processor(app)
+    init_feeds(app)
+    init_ingredient_index(app)
+    init_facet_index(app)
+    init_search_index(app)
 
     # Register blueprints
     from .auth.routes import auth_bp
@@ -58,6 +147,7 @@ def create_app():
     from .comments.routes import comments_bp
     from .favorites.routes import favorites_bp
     from .dietary_restrictions.routes import dietary_restrictions_bp
+    from .internal.routes import internal_bp
 
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(recipes_bp, url_prefix='/api/recipes')
@@ -67,10 +157,26 @@ def create_app():
     app.register_blueprint(comments_bp, url_prefix='/api/recipes')
     app.register_blueprint(favorites_bp, url_prefix='/api/user')
     app.register_blueprint(dietary_restrictions_bp, url_prefix='/api/dietary-restrictions')
+    app.register_blueprint(internal_bp, url_prefix='/internal')
+    
+    # Register CLI commands
+    from .commands import register_commands
+    register_commands(app)
     
-    # Serve uploaded files in development
+    # Serve uploaded files. Names are content-addressed, so responses are cacheable forever.
+    # With UPLOAD_SERVE_MODE=x-accel-redirect or x-sendfile the front web server sends the bytes.
     @app.route('/uploads/<path:filename>')
     def serve_upload(filename):
-        return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+        if app.config['UPLOAD_SERVE_MODE'] == 'x-accel-redirect':
+            path = safe_join(app.config['UPLOAD_FOLDER'], filename)
+            if path is None or not os.path.isfile(path):
+                abort(404)
+            response = Response(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+            response.headers['X-Accel-Redirect'] = app.config['UPLOAD_ACCEL_PREFIX'].rstrip('/') + '/' + filename
+        else:
+            # Handles ETag, Last-Modified, conditional requests and Range (and X-Sendfile when enabled)
+            response = send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        return response
 
     return app 
\ No newline at end of file
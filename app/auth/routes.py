@@ -2,7 +2,9 @@ from flask import Blueprint, jsonify, request
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 from app.models import User
 from app import db
-from app.utils.upload import validate_image, get_uploader
+from app.utils.upload import validate_image, upload_too_large, MAX_FILE_SIZE
+from app.utils.image_jobs import get_image_processor
+from app.utils.middleware import load_identity
 import re
 
 auth_bp = Blueprint('auth', __name__)
@@ -57,6 +59,9 @@ def validate_user_data(data, is_update=False):
 
 @auth_bp.route('/register', methods=['POST'])
 def register():
+    if upload_too_large(request):
+        return jsonify({'error': f"File size exceeds maximum limit of {MAX_FILE_SIZE/1024/1024}MB"}), 413
+        
     if not request.is_json:
         data = request.form.to_dict()
         profile_image = request.files.get('profile_image')
@@ -79,40 +84,37 @@ def register():
     if User.query.filter_by(username=data['username']).first():
         return jsonify({'error': 'Username already taken'}), 400
     
-    # Handle profile image upload
-    profile_image_url = None
+    # Validate profile image
     if profile_image:
-        # Validate image
         image_errors = validate_image(profile_image)
         if image_errors:
             return jsonify({'error': 'Invalid image', 'details': image_errors}), 400
-            
-        try:
-            # Upload image
-            uploader = get_uploader()
-            profile_image_url = uploader.upload_file(profile_image)
-        except ValueError as e:
-            return jsonify({'error': str(e)}), 400
     
     user = User(
         username=data['username'],
-        email=data['email'],
-        profile_image=profile_image_url
+        email=data['email']
     )
     user.set_password(data['password'])
     
     db.session.add(user)
     db.session.commit()
     
-    return jsonify({
+    response = {
         'message': 'User registered successfully',
         'user': {
             'user_id': user.user_id,
             'username': user.username,
             'email': user.email,
-            'profile_image': user.profile_image or None
+            'profile_image': None
         }
-    }), 201
+    }
+    
+    # Profile image is processed in the background and set on the user when done
+    if profile_image:
+        get_image_processor().submit(user.user_id, profile_image)
+        response['profile_image_status'] = 'processing'
+    
+    return jsonify(response), 201
 
 @auth_bp.route('/login', methods=['POST'])
 def login():
@@ -129,6 +131,11 @@ def login():
     user = User.query.filter_by(email=data['email']).first()
     
     if user and user.check_password(data['password']):
+        # Upgrade hashes made with outdated parameters while we have the password
+        if user.password_needs_rehash():
+            user.set_password(data['password'])
+            db.session.commit()
+            
         access_token = create_access_token(identity=user.user_id)
         return jsonify({
             'message': 'Login successful',
@@ -146,25 +153,18 @@ def login():
 @auth_bp.route('/user/me', methods=['GET'])
 @jwt_required()
 def get_current_user():
-    current_user_id = get_jwt_identity()
-    user = User.query.get_or_404(current_user_id)
-    return jsonify({
-        'user_id': user.user_id,
-        'username': user.username,
-        'email': user.email,
-        'profile_image': user.profile_image or None
-    })
+    identity = load_identity(get_jwt_identity())
+    if not identity:
+        return jsonify({'error': 'User not found'}), 404
+    return jsonify(identity)
 
 @auth_bp.route('/user/<int:user_id>', methods=['GET'])
 @jwt_required()
 def get_user(user_id):
-    user = User.query.get_or_404(user_id)
-    return jsonify({
-        'user_id': user.user_id,
-        'username': user.username,
-        'email': user.email,
-        'profile_image': user.profile_image or None
-    })
+    identity = load_identity(user_id)
+    if not identity:
+        return jsonify({'error': 'User not found'}), 404
+    return jsonify(identity)
 
 @auth_bp.route('/user/<int:user_id>', methods=['PUT'])
 @jwt_required()
@@ -215,6 +215,9 @@ def update_user(user_id):
 @auth_bp.route('/user/me/profile-image', methods=['POST'])
 @jwt_required()
 def update_profile_image():
+    if upload_too_large(request):
+        return jsonify({'error': f"File size exceeds maximum limit of {MAX_FILE_SIZE/1024/1024}MB"}), 413
+        
     if 'profile_image' not in request.files:
         return jsonify({'error': 'No file provided'}), 400
         
@@ -225,21 +228,14 @@ def update_profile_image():
     if image_errors:
         return jsonify({'error': 'Invalid image', 'details': image_errors}), 400
         
-    try:
-        # Upload image
-        uploader = get_uploader()
-        profile_image_url = uploader.upload_file(profile_image)
-        
-        # Update user profile
-        current_user_id = get_jwt_identity()
-        user = User.query.get_or_404(current_user_id)
-        user.profile_image = profile_image_url
-        db.session.commit()
-        
-        return jsonify({
-            'message': 'Profile image updated successfully',
-            'profile_image': profile_image_url
-        })
-        
-    except ValueError as e:
-        return jsonify({'error': str(e)}), 400 
\ No newline at end of file
+    current_user_id = get_jwt_identity()
+    if not load_identity(current_user_id):
+        return jsonify({'error': 'User not found'}), 404
+    
+    # Resize and upload in the background; the user record is updated when done
+    get_image_processor().submit(current_user_id, profile_image)
+    
+    return jsonify({
+        'message': 'Profile image accepted for processing',
+        'profile_image_status': 'processing'
+    }), 202 
\ No newline at end of file
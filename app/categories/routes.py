@@ -1,9 +1,13 @@
 from flask import Blueprint, jsonify
 from app.models import Category
+from app.utils.cache import cached_response, invalidate_on_write, lookup_ttl
 
 categories_bp = Blueprint('categories', __name__)
 
+invalidate_on_write(Category, 'categories')
+
 @categories_bp.route('/', methods=['GET'])
+@cached_response('categories', ttl=lookup_ttl)
 def get_categories():
     categories = Category.query.all()
     return jsonify([{
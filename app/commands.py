@@ -0,0 +1,76 @@
+import click
+from flask.cli import with_appcontext
+from app import db
+
+@click.command('reconcile-ratings')
+@with_appcontext
+def reconcile_ratings_command():
+    """Backfill or repair the denormalized rating aggregates on recipes."""
+    from app.models import Recipe
+    updated = Recipe.reconcile_rating_aggregates()
+    db.session.commit()
+    click.echo(f"Reconciled rating aggregates for {updated} recipes")
+
+@click.command('reconcile-comments')
+@with_appcontext
+def reconcile_comments_command():
+    """Backfill or repair the denormalized comment counts on recipes."""
+    from app.models import Recipe
+    updated = Recipe.reconcile_comment_counts()
+    db.session.commit()
+    click.echo(f"Reconciled comment counts for {updated} recipes")
+
+@click.command('import-recipes')
+@click.argument('file', type=click.File('rb'))
+@click.option('--user-id', type=int, required=True, help='Author assigned to imported recipes.')
+@click.option('--format', 'fmt', type=click.Choice(['jsonl', 'csv']), help='Defaults to the file extension.')
+@click.option('--chunk-size', type=int, default=1000, show_default=True, help='Recipes per transaction.')
+@click.option('--checkpoint', type=click.Path(dir_okay=False), help='Progress file used to resume an interrupted import.')
+@click.option('--no-create-ingredients', is_flag=True, help='Reject unknown ingredient names instead of creating them.')
+@with_appcontext
+def import_recipes_command(file, user_id, fmt, chunk_size, checkpoint, no_create_ingredients):
+    """Stream recipes from a JSONL or CSV file into the database."""
+    from app.models import User
+    from app.recipes.importer import RecipeImporter, detect_format, read_records
+    
+    if not db.session.get(User, user_id):
+        raise click.BadParameter(f"User {user_id} does not exist", param_hint='--user-id')
+    
+    def report(result, processed):
+        click.echo(f"Processed {processed} records: {result['imported']} imported, {result['failed']} failed")
+    
+    importer = RecipeImporter(
+        user_id,
+        chunk_size=chunk_size,
+        create_missing_ingredients=not no_create_ingredients,
+        checkpoint_path=checkpoint,
+        on_progress=report
+    )
+    result = importer.run(read_records(file, fmt or detect_format(file.name)))
+    
+    for error in result['errors']:
+        click.echo(f"Line {error['line']}: {'; '.join(error['details'])}", err=True)
+    click.echo(f"Done: {result['imported']} imported, {result['failed']} failed, {result['skipped']} skipped from checkpoint")
+
+@click.command('export-recipes')
+@click.argument('output', type=click.Path(dir_okay=False, allow_dash=True), default='-')
+@click.option('--type', 'export_type', type=click.Choice(['recipes', 'ratings', 'comments', 'favorites']),
+              default='recipes', show_default=True, help='What to export.')
+@click.option('--gzip', 'compress', is_flag=True, help='Gzip-compress the output.')
+@click.option('--batch-size', type=int, default=1000, show_default=True, help='Rows fetched per round trip.')
+@with_appcontext
+def export_recipes_command(output, export_type, compress, batch_size):
+    """Stream recipes or an interaction table as NDJSON to OUTPUT (default stdout)."""
+    from flask import current_app
+    from app.recipes.exporter import iter_export_records, iter_ndjson
+    
+    chunks = iter_ndjson(iter_export_records(export_type, batch_size), current_app.json.dumps, compress=compress)
+    with click.open_file(output, 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk)
+
+def register_commands(app):
+    app.cli.add_command(reconcile_ratings_command)
+    app.cli.add_command(reconcile_comments_command)
+    app.cli.add_command(import_recipes_command)
+    app.cli.add_command(export_recipes_command)
@@ -1,7 +1,10 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, abort, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.models import Comment, Recipe
 from app import db
+from app.utils.pagination import parse_page_args, paginate_keyset, MAX_PAGE_SIZE
+from app.utils.cache import cached_response, invalidate, recipe_comments_key, recipe_ttl
+from sqlalchemy.orm import contains_eager
 
 comments_bp = Blueprint('comments', __name__)
 
@@ -40,16 +43,13 @@ def add_comment(recipe_id):
         content=data['content'].strip()
     )
     db.session.add(comment)
+    Recipe.apply_comment_delta(recipe_id, 1)
     db.session.commit()
+    invalidate(recipe_comments_key(recipe_id))
     return jsonify({'message': 'Comment submitted successfully'})
 
-@comments_bp.route('/<int:recipe_id>/comments', methods=['GET'])
-def get_comments(recipe_id):
-    # Verify recipe exists
-    recipe = Recipe.query.get_or_404(recipe_id)
-    
-    comments = Comment.query.filter_by(recipe_id=recipe_id).order_by(Comment.created_at.desc()).all()
-    return jsonify([{
+def serialize_comment(c):
+    return {
         'comment_id': c.comment_id,
         'user': {
             'user_id': c.user.user_id,
@@ -57,4 +57,36 @@ def get_comments(recipe_id):
         },
         'content': c.content,
         'created_at': c.created_at
-    } for c in comments]) 
\ No newline at end of file
+    }
+
+@comments_bp.route('/<int:recipe_id>/comments', methods=['GET'])
+@cached_response(recipe_comments_key, ttl=recipe_ttl)
+def get_comments(recipe_id):
+    # Verify recipe exists, reading the maintained comment counter
+    total = db.session.query(Recipe.comment_count).filter(Recipe.recipe_id == recipe_id).scalar()
+    if total is None:
+        abort(404)
+    
+    # Join authors so they load in the same statement
+    query = Comment.query.join(Comment.user).options(contains_eager(Comment.user)) \
+        .filter(Comment.recipe_id == recipe_id)
+    
+    # Keyset pagination mode, newest first
+    if 'limit' in request.args or 'after' in request.args:
+        limit, after, errors = parse_page_args(request.args)
+        if errors:
+            return jsonify({'error': 'Invalid pagination parameters', 'details': errors}), 400
+            
+        comments, next_cursor = paginate_keyset(
+            query, Comment.created_at, Comment.comment_id, limit, after,
+            key=lambda c: (c.created_at, c.comment_id)
+        )
+        return jsonify({
+            'comments': [serialize_comment(c) for c in comments],
+            'next_cursor': next_cursor,
+            'total': total
+        })
+    
+    # Unpaginated requests get the newest MAX_PAGE_SIZE comments
+    comments = query.order_by(Comment.created_at.desc(), Comment.comment_id.desc()).limit(MAX_PAGE_SIZE).all()
+    return jsonify([serialize_comment(c) for c in comments])
\ No newline at end of file
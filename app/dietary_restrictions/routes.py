@@ -1,9 +1,13 @@
 from flask import Blueprint, jsonify
 from app.models import DietaryRestriction
+from app.utils.cache import cached_response, invalidate_on_write, lookup_ttl
 
 dietary_restrictions_bp = Blueprint('dietary_restrictions', __name__)
 
+invalidate_on_write(DietaryRestriction, 'dietary_restrictions')
+
 @dietary_restrictions_bp.route('/', methods=['GET'])
+@cached_response('dietary_restrictions', ttl=lookup_ttl)
 def get_dietary_restrictions():
     restrictions = DietaryRestriction.query.all()
     return jsonify([{
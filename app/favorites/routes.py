@@ -1,21 +1,102 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models import Favorite, Recipe
+from app.models import Favorite, Recipe, Rating
 from app import db
+from app.utils.pagination import parse_page_args, paginate_keyset, MAX_PAGE_SIZE
+from app.utils.params import parse_id_list
+from sqlalchemy.orm import contains_eager
 
 favorites_bp = Blueprint('favorites', __name__)
 
+MAX_BATCH_RECIPE_IDS = 500
+
+def serialize_favorite(f):
+    return {
+        'recipe_id': f.recipe.recipe_id,
+        'title': f.recipe.title,
+        'description': f.recipe.description,
+        'image_url': f.recipe.image_url,
+        'favorited_at': f.created_at
+    }
+
 @favorites_bp.route('/me/favorites', methods=['GET'])
 @jwt_required()
 def get_favorites():
     current_user_id = get_jwt_identity()
-    favorites = Favorite.query.filter_by(user_id=current_user_id).all()
+    
+    # Compact mode for marking hearts on listing pages
+    if request.args.get('ids_only', '').lower() in ('1', 'true'):
+        recipe_ids = db.session.query(Favorite.recipe_id).filter(Favorite.user_id == current_user_id)
+        return jsonify({'recipe_ids': [recipe_id for (recipe_id,) in recipe_ids]})
+    
+    order = request.args.get('order', 'desc')
+    if order not in ('asc', 'desc'):
+        return jsonify({'error': "Order must be 'asc' or 'desc'"}), 400
+    
+    # Join recipes so they load in the same statement
+    query = Favorite.query.join(Favorite.recipe).options(contains_eager(Favorite.recipe)) \
+        .filter(Favorite.user_id == current_user_id)
+    
+    # Keyset pagination mode
+    if 'limit' in request.args or 'after' in request.args:
+        limit, after, errors = parse_page_args(request.args)
+        if errors:
+            return jsonify({'error': 'Invalid pagination parameters', 'details': errors}), 400
+            
+        favorites, next_cursor = paginate_keyset(
+            query, Favorite.created_at, Favorite.favorite_id, limit, after,
+            key=lambda f: (f.created_at, f.favorite_id), descending=order == 'desc'
+        )
+        return jsonify({
+            'favorites': [serialize_favorite(f) for f in favorites],
+            'next_cursor': next_cursor
+        })
+    
+    if order == 'desc':
+        query = query.order_by(Favorite.created_at.desc(), Favorite.favorite_id.desc())
+    else:
+        query = query.order_by(Favorite.created_at.asc(), Favorite.favorite_id.asc())
+    # Unpaginated requests get the first MAX_PAGE_SIZE favorites
+    return jsonify([serialize_favorite(f) for f in query.limit(MAX_PAGE_SIZE).all()])
+
+@favorites_bp.route('/me/interactions', methods=['GET'])
+@jwt_required()
+def get_interactions():
+    """The caller's favorite flag and rating for each of a batch of recipes"""
+    recipe_ids, errors = parse_id_list(request.args.getlist('recipe_ids'), 'Recipe ID')
+    if not recipe_ids and not errors:
+        errors.append("At least one recipe ID is required")
+    if len(recipe_ids) > MAX_BATCH_RECIPE_IDS:
+        errors.append(f"At most {MAX_BATCH_RECIPE_IDS} recipe IDs may be requested at once")
+    if errors:
+        return jsonify({'error': 'Validation failed', 'details': errors}), 400
+    
+    # Both lookups go to the database as one UNION ALL round trip
+    current_user_id = get_jwt_identity()
+    favorites_query = db.select(
+        Favorite.recipe_id,
+        db.literal('favorite').label('kind'),
+        db.null().label('rating')
+    ).where(Favorite.user_id == current_user_id, Favorite.recipe_id.in_(recipe_ids))
+    ratings_query = db.select(
+        Rating.recipe_id,
+        db.literal('rating').label('kind'),
+        Rating.rating
+    ).where(Rating.user_id == current_user_id, Rating.recipe_id.in_(recipe_ids))
+    
+    favorited = set()
+    ratings = {}
+    for recipe_id, kind, rating in db.session.execute(db.union_all(favorites_query, ratings_query)):
+        if kind == 'favorite':
+            favorited.add(recipe_id)
+        else:
+            ratings[recipe_id] = rating
+    
     return jsonify([{
-        'recipe_id': f.recipe.recipe_id,
-        'title': f.recipe.title,
-        'description': f.recipe.description,
-        'image_url': f.recipe.image_url
-    } for f in favorites])
+        'recipe_id': recipe_id,
+        'favorited': recipe_id in favorited,
+        'rating': ratings.get(recipe_id)
+    } for recipe_id in recipe_ids])
 
 @favorites_bp.route('/recipes/<int:recipe_id>/favorites', methods=['POST'])
 @jwt_required()
@@ -23,21 +104,10 @@ def add_favorite(recipe_id):
     # Verify recipe exists
     recipe = Recipe.query.get_or_404(recipe_id)
     
-    # Check if already favorited
     current_user_id = get_jwt_identity()
-    existing_favorite = Favorite.query.filter_by(
-        user_id=current_user_id,
-        recipe_id=recipe_id
-    ).first()
-    
-    if existing_favorite:
+    if not Favorite.add(current_user_id, recipe_id):
         return jsonify({'error': 'Recipe already in favorites'}), 400
         
-    favorite = Favorite(
-        user_id=current_user_id,
-        recipe_id=recipe_id
-    )
-    db.session.add(favorite)
     db.session.commit()
     return jsonify({'message': 'Recipe favorited successfully'})
 
@@ -1,9 +1,13 @@
 from flask import Blueprint, jsonify
 from app.models import Ingredient
+from app.utils.cache import cached_response, invalidate_on_write, lookup_ttl
 
 ingredients_bp = Blueprint('ingredients', __name__)
 
+invalidate_on_write(Ingredient, 'ingredients')
+
 @ingredients_bp.route('/', methods=['GET'])
+@cached_response('ingredients', ttl=lookup_ttl)
 def get_ingredients():
     ingredients = Ingredient.query.all()
     return jsonify([{
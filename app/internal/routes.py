@@ -0,0 +1,33 @@
+import hmac
+from functools import wraps
+from flask import Blueprint, current_app, jsonify, request
+from app import db
+from app.utils.db_pool import get_pool_metrics
+
+internal_bp = Blueprint('internal', __name__)
+
+def internal_only(f):
+    """
+    Require INTERNAL_API_TOKEN as a bearer token. Internal endpoints are
+    disabled when it is unset: the client address can't be trusted, since
+    behind a reverse proxy every request arrives from localhost.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        token = current_app.config['INTERNAL_API_TOKEN']
+        if not token:
+            return jsonify({'error': 'Internal API is disabled'}), 403
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return jsonify({'error': 'Unauthorized'}), 401
+        return f(*args, **kwargs)
+    return decorated
+
+@internal_bp.route('/db-pool', methods=['GET'])
+@internal_only
+def get_db_pool_metrics():
+    stats = get_pool_metrics().snapshot(db.engine.pool)
+    replicas = {bind_key: get_pool_metrics(bind_key).snapshot(engine.pool)
+                for bind_key, engine in db.engines.items() if bind_key is not None}
+    if replicas:
+        stats['replicas'] = replicas
+    return jsonify(stats)
@@ -7,6 +7,11 @@ class DietaryRestriction(db.Model):
 
 class RecipeDietaryRestriction(db.Model):
     __tablename__ = 'recipe_dietary_restrictions'
+    __table_args__ = (
+        # Filtering recipes by restriction, and loading a recipe's restrictions
+        db.Index('ix_recipe_dietary_restrictions_restriction_recipe', 'dietary_restriction_id', 'recipe_id'),
+        db.Index('ix_recipe_dietary_restrictions_recipe_id', 'recipe_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     recipe_id = db.Column(db.Integer, db.ForeignKey('recipes.recipe_id', ondelete='CASCADE'), nullable=False)
     dietary_restriction_id = db.Column(db.Integer, db.ForeignKey('dietary_restrictions.dietary_restriction_id', ondelete='CASCADE'), nullable=False) 
\ No newline at end of file
@@ -8,8 +8,12 @@ class Ingredient(db.Model):
 
 class RecipeIngredient(db.Model):
     __tablename__ = 'recipe_ingredients'
+    __table_args__ = (
+        # Filtering recipes by ingredient
+        db.Index('ix_recipe_ingredients_ingredient_recipe', 'ingredient_id', 'recipe_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
-    recipe_id = db.Column(db.Integer, db.ForeignKey('recipes.recipe_id', ondelete='CASCADE'), nullable=False)
+    recipe_id = db.Column(db.Integer, db.ForeignKey('recipes.recipe_id', ondelete='CASCADE'), nullable=False, index=True)
     ingredient_id = db.Column(db.Integer, db.ForeignKey('ingredients.ingredient_id', ondelete='CASCADE'), nullable=False)
     quantity = db.Column(db.Numeric(10, 2), nullable=False)
     unit = db.Column(db.String(50), nullable=False) 
\ No newline at end of file
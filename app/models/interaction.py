@@ -1,16 +1,86 @@
 from datetime import datetime
+from sqlalchemy.dialects import postgresql
 from app import db
+from app.utils.sql import dialect_insert
 
 class Rating(db.Model):
     __tablename__ = 'ratings'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'recipe_id', name='uq_ratings_user_recipe'),
+        db.Index('ix_ratings_recipe_id', 'recipe_id'),
+    )
     rating_id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.user_id', ondelete='CASCADE'), nullable=False)
     recipe_id = db.Column(db.Integer, db.ForeignKey('recipes.recipe_id', ondelete='CASCADE'), nullable=False)
     rating = db.Column(db.Integer, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    @staticmethod
+    def upsert(user_id, recipe_id, value):
+        """
+        Insert or overwrite a user's rating of a recipe, returning the
+        previous value (None when the rating is new) so callers can adjust
+        the recipe's aggregates by the exact difference.
+
+        On PostgreSQL this is a single statement, see _upsert_postgresql.
+        Elsewhere an existing row is locked and updated; a new one is
+        inserted with ON CONFLICT DO NOTHING, retrying as an update if a
+        concurrent request inserted the same rating first.
+        """
+        if db.engine.dialect.name == 'postgresql':
+            return Rating._upsert_postgresql(user_id, recipe_id, value)
+        
+        match = (Rating.user_id == user_id, Rating.recipe_id == recipe_id)
+        while True:
+            previous = db.session.execute(
+                db.select(Rating.rating).where(*match).with_for_update()
+            ).scalar()
+            if previous is not None:
+                db.session.execute(db.update(Rating).where(*match).values(rating=value))
+                return previous
+
+            inserted = db.session.execute(
+                dialect_insert(Rating)
+                .values(user_id=user_id, recipe_id=recipe_id, rating=value)
+                .on_conflict_do_nothing(index_elements=['user_id', 'recipe_id'])
+                .returning(Rating.rating_id)
+            ).first()
+            if inserted:
+                return None
+
+    @staticmethod
+    def _upsert_postgresql(user_id, recipe_id, value):
+        """
+        One statement: a CTE locks and reads the current rating, and
+        INSERT ... ON CONFLICT DO UPDATE returns it with RETURNING (SELECT
+        rating FROM old). The update is conditioned on the CTE having seen
+        the row, so the returned value is exactly the one replaced; a rating
+        inserted concurrently after the statement's snapshot yields no row
+        instead, and the statement is re-run to pick it up. The condition
+        also makes PostgreSQL evaluate the CTE before the update: referenced
+        from RETURNING alone, it would run afterwards and miss the row.
+        Covered by tests/test_rating_upsert.py (needs TEST_POSTGRES_URL).
+        """
+        old = db.select(Rating.rating).where(
+            Rating.user_id == user_id, Rating.recipe_id == recipe_id
+        ).with_for_update().cte('old')
+        insert = postgresql.insert(Rating).values(user_id=user_id, recipe_id=recipe_id, rating=value)
+        statement = insert.on_conflict_do_update(
+            index_elements=['user_id', 'recipe_id'],
+            set_={'rating': insert.excluded.rating},
+            where=db.select(old.c.rating).exists()
+        ).add_cte(old).returning(db.select(old.c.rating).scalar_subquery())
+        while True:
+            row = db.session.execute(statement).first()
+            if row is not None:
+                return row[0]
+
 class Comment(db.Model):
     __tablename__ = 'comments'
+    __table_args__ = (
+        # Backs keyset pagination of a recipe's comments
+        db.Index('ix_comments_recipe_created', 'recipe_id', 'created_at', 'comment_id'),
+    )
     comment_id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.user_id', ondelete='CASCADE'), nullable=False)
     recipe_id = db.Column(db.Integer, db.ForeignKey('recipes.recipe_id', ondelete='CASCADE'), nullable=False)
@@ -19,7 +89,23 @@ class Comment(db.Model):
 
 class Favorite(db.Model):
     __tablename__ = 'favorites'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'recipe_id', name='uq_favorites_user_recipe'),
+        # Backs a user's favorites listing ordered by favorited date
+        db.Index('ix_favorites_user_created', 'user_id', 'created_at', 'favorite_id'),
+    )
     favorite_id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.user_id', ondelete='CASCADE'), nullable=False)
     recipe_id = db.Column(db.Integer, db.ForeignKey('recipes.recipe_id', ondelete='CASCADE'), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow) 
\ No newline at end of file
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @staticmethod
+    def add(user_id, recipe_id):
+        """Favorite a recipe in one statement, returning False if it already was"""
+        inserted = db.session.execute(
+            dialect_insert(Favorite)
+            .values(user_id=user_id, recipe_id=recipe_id)
+            .on_conflict_do_nothing(index_elements=['user_id', 'recipe_id'])
+            .returning(Favorite.favorite_id)
+        ).first()
+        return inserted is not None
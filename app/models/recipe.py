@@ -1,23 +1,95 @@
 from datetime import datetime
+from sqlalchemy import case, cast, event, DDL, Float
+from sqlalchemy.ext.hybrid import hybrid_property
 from app import db
 
 class Recipe(db.Model):
     __tablename__ = 'recipes'
     recipe_id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id', ondelete='CASCADE'), nullable=False, index=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text, nullable=False)
     instructions = db.Column(db.Text, nullable=False)
-    category_id = db.Column(db.Integer, db.ForeignKey('categories.category_id', ondelete='SET NULL'))
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.category_id', ondelete='SET NULL'), index=True)
     image_url = db.Column(db.Text)
     prep_time = db.Column(db.Integer)
     cook_time = db.Column(db.Integer)
     servings = db.Column(db.Integer)
+    # Denormalized rating aggregates, maintained by the ratings endpoints
+    rating_sum = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    ingredients = db.relationship('RecipeIngredient', backref='recipe', lazy=True)
-    ratings = db.relationship('Rating', backref='recipe', lazy=True)
-    comments = db.relationship('Comment', backref='recipe', lazy=True)
-    favorites = db.relationship('Favorite', backref='recipe', lazy=True)
-    dietary_restrictions = db.relationship('DietaryRestriction', secondary='recipe_dietary_restrictions') 
\ No newline at end of file
+    # Child rows are removed by the database's ON DELETE CASCADE
+    ingredients = db.relationship('RecipeIngredient', backref='recipe', lazy=True, passive_deletes=True)
+    ratings = db.relationship('Rating', backref='recipe', lazy=True, passive_deletes=True)
+    comments = db.relationship('Comment', backref='recipe', lazy=True, passive_deletes=True)
+    favorites = db.relationship('Favorite', backref='recipe', lazy=True, passive_deletes=True)
+    dietary_restrictions = db.relationship('DietaryRestriction', secondary='recipe_dietary_restrictions')
+
+    @staticmethod
+    def apply_rating_delta(recipe_id, sum_delta, count_delta):
+        """Adjust the rating aggregates in SQL so concurrent raters don't lose updates"""
+        Recipe.query.filter(Recipe.recipe_id == recipe_id).update({
+            Recipe.rating_sum: Recipe.rating_sum + sum_delta,
+            Recipe.rating_count: Recipe.rating_count + count_delta,
+            # A new rating is not an edit of the recipe itself
+            Recipe.updated_at: Recipe.updated_at
+        })
+
+    @staticmethod
+    def reconcile_rating_aggregates():
+        """Recompute rating_sum/rating_count from the ratings table in one statement"""
+        from .interaction import Rating
+        rating_sum = db.select(db.func.coalesce(db.func.sum(Rating.rating), 0)) \
+            .where(Rating.recipe_id == Recipe.recipe_id).scalar_subquery()
+        rating_count = db.select(db.func.count(Rating.rating_id)) \
+            .where(Rating.recipe_id == Recipe.recipe_id).scalar_subquery()
+        return Recipe.query.update({
+            Recipe.rating_sum: rating_sum,
+            Recipe.rating_count: rating_count,
+            Recipe.updated_at: Recipe.updated_at
+        }, synchronize_session=False)
+
+    @staticmethod
+    def apply_comment_delta(recipe_id, delta):
+        Recipe.query.filter(Recipe.recipe_id == recipe_id).update({
+            Recipe.comment_count: Recipe.comment_count + delta,
+            Recipe.updated_at: Recipe.updated_at
+        })
+
+    @staticmethod
+    def reconcile_comment_counts():
+        """Recompute comment_count from the comments table in one statement"""
+        from .interaction import Comment
+        comment_count = db.select(db.func.count(Comment.comment_id)) \
+            .where(Comment.recipe_id == Recipe.recipe_id).scalar_subquery()
+        return Recipe.query.update({
+            Recipe.comment_count: comment_count,
+            Recipe.updated_at: Recipe.updated_at
+        }, synchronize_session=False)
+
+    @hybrid_property
+    def average_rating(self):
+        return self.rating_sum / self.rating_count if self.rating_count else 0
+
+    @average_rating.expression
+    def average_rating(cls):
+        return case(
+            (cls.rating_count > 0, cast(cls.rating_sum, Float) / cls.rating_count),
+            else_=0.0
+        )
+
+# Weighted full-text search vector (title > description > instructions) with a
+# GIN index. PostgreSQL keeps the generated column in sync on every write.
+event.listen(Recipe.__table__, 'after_create', DDL(
+    "ALTER TABLE recipes ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(instructions, '')), 'C')) STORED"
+).execute_if(dialect='postgresql'))
+event.listen(Recipe.__table__, 'after_create', DDL(
+    "CREATE INDEX ix_recipes_search_vector ON recipes USING GIN (search_vector)"
+).execute_if(dialect='postgresql'))
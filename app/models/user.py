@@ -1,6 +1,6 @@
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
 from app import db
+from app.utils.passwords import get_password_hasher
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -18,7 +18,10 @@ class User(db.Model):
     favorites = db.relationship('Favorite', backref='user', lazy=True)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = get_password_hasher().hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password) 
\ No newline at end of file
+        return get_password_hasher().verify(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return get_password_hasher().needs_rehash(self.password_hash) 
\ No newline at end of file
@@ -2,6 +2,8 @@ from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.models import Rating, Recipe
 from app import db
+from app.utils.facets import adjust_recipe_rating
+from app.utils.cache import cached_response, invalidate, recipe_key, recipe_ratings_key, recipe_ttl
 
 ratings_bp = Blueprint('ratings', __name__)
 
@@ -27,51 +29,34 @@ def add_rating(recipe_id):
     # Verify recipe exists
     recipe = Recipe.query.get_or_404(recipe_id)
     
-    # Verify user hasn't already rated this recipe
     current_user_id = get_jwt_identity()
-    existing_rating = Rating.query.filter_by(
-        user_id=current_user_id,
-        recipe_id=recipe_id
-    ).first()
-    
     data = request.get_json()
     validation_errors = validate_rating_data(data)
     if validation_errors:
         return jsonify({'error': 'Validation failed', 'details': validation_errors}), 400
     
-    if existing_rating:
-        # Update existing rating
-        existing_rating.rating = data['rating']
+    # One rating per user per recipe; a repeat rating replaces the old one
+    previous = Rating.upsert(current_user_id, recipe_id, data['rating'])
+    if previous is not None:
+        sum_delta, count_delta = data['rating'] - previous, 0
         message = "Rating updated successfully"
     else:
-        # Create new rating
-        rating = Rating(
-            user_id=current_user_id,
-            recipe_id=recipe_id,
-            rating=data['rating']
-        )
-        db.session.add(rating)
+        sum_delta, count_delta = data['rating'], 1
         message = "Rating submitted successfully"
+    Recipe.apply_rating_delta(recipe_id, sum_delta, count_delta)
     
     db.session.commit()
+    adjust_recipe_rating(recipe_id, sum_delta, count_delta)
+    invalidate(recipe_key(recipe_id), recipe_ratings_key(recipe_id))
     return jsonify({'message': message})
 
 @ratings_bp.route('/<int:recipe_id>/ratings', methods=['GET'])
+@cached_response(recipe_ratings_key, ttl=recipe_ttl)
 def get_ratings(recipe_id):
     # Verify recipe exists
     recipe = Recipe.query.get_or_404(recipe_id)
     
-    ratings = Rating.query.filter_by(recipe_id=recipe_id).all()
-    if not ratings:
-        return jsonify({
-            'average_rating': 0,
-            'number_of_ratings': 0
-        })
-    
-    total_ratings = len(ratings)
-    average_rating = sum(r.rating for r in ratings) / total_ratings
-    
     return jsonify({
-        'average_rating': round(average_rating, 1),
-        'number_of_ratings': total_ratings
-    }) 
\ No newline at end of file
+        'average_rating': round(recipe.average_rating, 1),
+        'number_of_ratings': recipe.rating_count
+    })
\ No newline at end of file
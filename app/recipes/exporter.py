@@ -0,0 +1,110 @@
+import zlib
+from sqlalchemy import select
+from app import db
+from app.models import (Recipe, User, Ingredient, RecipeIngredient, RecipeDietaryRestriction,
+                        Rating, Comment, Favorite)
+from app.recipes.importer import RECIPE_FIELDS
+
+EXPORT_INTERACTIONS = {'ratings': Rating, 'comments': Comment, 'favorites': Favorite}
+EXPORT_TYPES = ('recipes', *EXPORT_INTERACTIONS)
+DEFAULT_BATCH_SIZE = 1000
+FLUSH_SIZE = 64 * 1024
+
+def iter_recipe_records(batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Yield recipes with their ingredients, dietary restrictions and rating
+    aggregates, in the record format accepted by the importer.
+
+    Recipe rows (not ORM objects) are read through a server-side cursor in
+    batches; each batch's child rows are fetched with one query per child
+    table, so memory use is bounded by the batch size, not the table size.
+    """
+    recipes = db.session.execute(
+        select(Recipe.recipe_id, Recipe.user_id, User.username,
+               *(getattr(Recipe, field) for field in RECIPE_FIELDS),
+               Recipe.rating_sum, Recipe.rating_count, Recipe.comment_count,
+               Recipe.created_at, Recipe.updated_at)
+        .join(Recipe.author)
+        .order_by(Recipe.recipe_id)
+        .execution_options(yield_per=batch_size)
+    )
+    for batch in recipes.partitions():
+        recipe_ids = [recipe.recipe_id for recipe in batch]
+
+        ingredients = {}
+        for row in db.session.execute(
+            select(RecipeIngredient.recipe_id, RecipeIngredient.ingredient_id, Ingredient.name,
+                   RecipeIngredient.quantity, RecipeIngredient.unit)
+            .join(Ingredient, Ingredient.ingredient_id == RecipeIngredient.ingredient_id)
+            .where(RecipeIngredient.recipe_id.in_(recipe_ids))
+            .order_by(RecipeIngredient.recipe_id, RecipeIngredient.id)
+        ):
+            ingredients.setdefault(row.recipe_id, []).append({
+                'ingredient_id': row.ingredient_id,
+                'name': row.name,
+                'quantity': row.quantity,
+                'unit': row.unit
+            })
+
+        dietary_restrictions = {}
+        for recipe_id, dr_id in db.session.execute(
+            select(RecipeDietaryRestriction.recipe_id, RecipeDietaryRestriction.dietary_restriction_id)
+            .where(RecipeDietaryRestriction.recipe_id.in_(recipe_ids))
+            .order_by(RecipeDietaryRestriction.recipe_id, RecipeDietaryRestriction.dietary_restriction_id)
+        ):
+            dietary_restrictions.setdefault(recipe_id, []).append(dr_id)
+
+        for recipe in batch:
+            record = {field: getattr(recipe, field) for field in RECIPE_FIELDS}
+            record.update({
+                'recipe_id': recipe.recipe_id,
+                'author': {'user_id': recipe.user_id, 'username': recipe.username},
+                'ingredients': ingredients.get(recipe.recipe_id, []),
+                'dietary_restrictions': dietary_restrictions.get(recipe.recipe_id, []),
+                'average_rating': round(recipe.rating_sum / recipe.rating_count, 2) if recipe.rating_count else 0,
+                'ratings_count': recipe.rating_count,
+                'comments_count': recipe.comment_count,
+                'created_at': recipe.created_at,
+                'updated_at': recipe.updated_at
+            })
+            yield record
+
+def iter_interaction_records(model, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield every row of an interaction table as a dict of its columns"""
+    columns = model.__table__.columns
+    rows = db.session.execute(
+        select(*columns).order_by(*model.__table__.primary_key.columns)
+        .execution_options(yield_per=batch_size)
+    )
+    for row in rows:
+        yield row._asdict()
+
+def iter_export_records(export_type, batch_size=DEFAULT_BATCH_SIZE):
+    if export_type == 'recipes':
+        return iter_recipe_records(batch_size)
+    return iter_interaction_records(EXPORT_INTERACTIONS[export_type], batch_size)
+
+def iter_ndjson(records, dumps, compress=False):
+    """
+    Encode records as NDJSON byte chunks of roughly FLUSH_SIZE, gzip
+    compressed on the fly when `compress` is set.
+    """
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    buffer = []
+    buffered = 0
+    for record in records:
+        line = (dumps(record) + '\n').encode()
+        buffer.append(line)
+        buffered += len(line)
+        if buffered >= FLUSH_SIZE:
+            chunk = b''.join(buffer)
+            buffer, buffered = [], 0
+            chunk = compressor.compress(chunk) if compressor else chunk
+            if chunk:
+                yield chunk
+
+    chunk = b''.join(buffer)
+    if compressor:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
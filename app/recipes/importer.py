@@ -0,0 +1,223 @@
+import csv
+import io
+import json
+import os
+from types import SimpleNamespace
+from sqlalchemy import insert
+from app import db
+from app.models import Recipe, Category, Ingredient, DietaryRestriction, RecipeIngredient, RecipeDietaryRestriction
+from app.recipes.routes import validate_recipe_data, to_quantity
+from app.utils.search import index_recipe
+from app.utils.ingredient_index import refresh_recipe_ingredients
+from app.utils.facets import refresh_recipe_facets
+
+RECIPE_FIELDS = ['title', 'description', 'instructions', 'category_id',
+                 'image_url', 'prep_time', 'cook_time', 'servings']
+CSV_INT_FIELDS = ['category_id', 'prep_time', 'cook_time', 'servings']
+CSV_JSON_FIELDS = ['ingredients', 'dietary_restrictions']
+MAX_REPORTED_ERRORS = 100
+
+def detect_format(filename, content_type=None):
+    if (content_type or '').startswith('text/csv') or (filename or '').lower().endswith('.csv'):
+        return 'csv'
+    return 'jsonl'
+
+def read_records(stream, fmt):
+    """
+    Yield (line_number, record) pairs from a binary or text stream without
+    loading it whole. Unparseable rows yield a list of error strings instead
+    of a record.
+    """
+    if not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, parse_csv_row(row)
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, [f"Invalid JSON: {e}"]
+            continue
+        yield line_number, record if isinstance(record, dict) else ["Record must be an object"]
+
+def parse_csv_row(row):
+    """CSV rows carry numbers as text and ingredients/dietary restrictions as JSON"""
+    record = {}
+    for key, value in row.items():
+        if key is None or value is None or value == '':
+            continue
+        if key in CSV_INT_FIELDS:
+            try:
+                value = int(value)
+            except ValueError:
+                pass
+        elif key in CSV_JSON_FIELDS:
+            try:
+                value = json.loads(value)
+            except ValueError:
+                return [f"Column '{key}' must contain JSON"]
+        record[key] = value
+    return record
+
+def read_checkpoint(path):
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return json.load(f).get('processed', 0)
+    return 0
+
+def write_checkpoint(path, processed):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'processed': processed}, f)
+    os.replace(tmp_path, path)
+
+class RecipeImporter:
+    """
+    Import recipes in chunked bulk transactions.
+
+    Each chunk inserts its recipes with one multi-row INSERT ... RETURNING,
+    then all their ingredient and dietary restriction rows with one INSERT
+    each, and commits. Ingredients may be given by name; names are resolved
+    through an in-memory map and, optionally, created when missing.
+    """
+
+    def __init__(self, user_id, chunk_size=1000, create_missing_ingredients=True,
+                 checkpoint_path=None, on_progress=None):
+        self.user_id = user_id
+        self.chunk_size = chunk_size
+        self.create_missing_ingredients = create_missing_ingredients
+        self.checkpoint_path = checkpoint_path
+        self.on_progress = on_progress
+
+        self.ingredient_ids = {name.strip().lower(): ingredient_id for name, ingredient_id
+                               in db.session.query(Ingredient.name, Ingredient.ingredient_id)}
+        self.known_ingredient_ids = set(self.ingredient_ids.values())
+        self.category_ids = {c for (c,) in db.session.query(Category.category_id)}
+        self.dietary_restriction_ids = {d for (d,) in db.session.query(DietaryRestriction.dietary_restriction_id)}
+
+        self.result = {'imported': 0, 'failed': 0, 'skipped': 0, 'errors': []}
+
+    def run(self, records):
+        """Consume (line_number, record) pairs, returning a summary dict"""
+        already_processed = read_checkpoint(self.checkpoint_path)
+        processed = 0
+        chunk = []
+
+        for line_number, record in records:
+            processed += 1
+            if processed <= already_processed:
+                self.result['skipped'] += 1
+                continue
+
+            errors = record if isinstance(record, list) else self.prepare(record)
+            if errors:
+                self.record_failure(line_number, errors)
+            else:
+                chunk.append(record)
+
+            if len(chunk) >= self.chunk_size:
+                self.write_chunk(chunk, processed)
+                chunk = []
+
+        self.write_chunk(chunk, processed)
+        return self.result
+
+    def record_failure(self, line_number, errors):
+        self.result['failed'] += 1
+        if len(self.result['errors']) < MAX_REPORTED_ERRORS:
+            self.result['errors'].append({'line': line_number, 'details': errors})
+
+    def prepare(self, record):
+        """Resolve ingredient names in place and validate, returning errors"""
+        errors = []
+        ingredients = record.get('ingredients')
+        if isinstance(ingredients, list):
+            for i, ing in enumerate(ingredients):
+                if isinstance(ing, dict) and 'ingredient_id' not in ing and isinstance(ing.get('name'), str):
+                    ingredient_id = self.resolve_ingredient(ing['name'])
+                    if ingredient_id is None:
+                        errors.append(f"Ingredient {i+1} '{ing['name']}' does not exist")
+                    else:
+                        ing['ingredient_id'] = ingredient_id
+        if errors:
+            return errors
+
+        errors = validate_recipe_data(record)
+        if errors:
+            return errors
+
+        if record['category_id'] not in self.category_ids:
+            errors.append(f"Category {record['category_id']} does not exist")
+        for ing in record.get('ingredients', []):
+            if ing['ingredient_id'] not in self.known_ingredient_ids:
+                errors.append(f"Ingredient {ing['ingredient_id']} does not exist")
+        for dr_id in record.get('dietary_restrictions', []):
+            if dr_id not in self.dietary_restriction_ids:
+                errors.append(f"Dietary restriction {dr_id} does not exist")
+        return errors
+
+    def resolve_ingredient(self, name):
+        key = name.strip().lower()
+        if key in self.ingredient_ids:
+            return self.ingredient_ids[key]
+        if not self.create_missing_ingredients or not key or len(name.strip()) > 100:
+            return None
+
+        ingredient = Ingredient(name=name.strip())
+        db.session.add(ingredient)
+        db.session.flush()
+        self.ingredient_ids[key] = ingredient.ingredient_id
+        self.known_ingredient_ids.add(ingredient.ingredient_id)
+        return ingredient.ingredient_id
+
+    def write_chunk(self, chunk, processed):
+        recipe_ids = []
+        if chunk:
+            recipe_ids = db.session.scalars(
+                insert(Recipe).returning(Recipe.recipe_id, sort_by_parameter_order=True),
+                [dict({field: record.get(field) for field in RECIPE_FIELDS}, user_id=self.user_id)
+                 for record in chunk]
+            ).all()
+
+            ingredient_rows = []
+            dietary_rows = []
+            for recipe_id, record in zip(recipe_ids, chunk):
+                ingredient_rows.extend({
+                    'recipe_id': recipe_id,
+                    'ingredient_id': ing['ingredient_id'],
+                    'quantity': to_quantity(ing['quantity']),
+                    'unit': ing['unit']
+                } for ing in record.get('ingredients', []))
+                dietary_rows.extend({
+                    'recipe_id': recipe_id,
+                    'dietary_restriction_id': dr_id
+                } for dr_id in dict.fromkeys(record.get('dietary_restrictions', [])))
+
+            if ingredient_rows:
+                db.session.execute(insert(RecipeIngredient), ingredient_rows)
+            if dietary_rows:
+                db.session.execute(insert(RecipeDietaryRestriction), dietary_rows)
+
+        # Commit even an empty chunk so newly created ingredients are kept
+        db.session.commit()
+
+        for recipe_id, record in zip(recipe_ids, chunk):
+            index_recipe(SimpleNamespace(recipe_id=recipe_id, title=record['title'],
+                                         description=record['description'],
+                                         instructions=record['instructions']))
+            refresh_recipe_ingredients(recipe_id, [ing['ingredient_id'] for ing in record.get('ingredients', [])])
+        refresh_recipe_facets(recipe_ids)
+
+        self.result['imported'] += len(chunk)
+        if self.checkpoint_path:
+            write_checkpoint(self.checkpoint_path, processed)
+        if self.on_progress:
+            self.on_progress(self.result, processed)
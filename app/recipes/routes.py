@@ -1,11 +1,28 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.models import Recipe, Ingredient, RecipeIngredient, RecipeDietaryRestriction
 from app import db
-from sqlalchemy import or_
+from app.utils.pagination import (parse_page_args, paginate_keyset, paginate_ordered, apply_order, decode_cursor,
+                                  encode_rank_cursor, decode_rank_cursor, encode_rating_cursor, decode_rating_cursor,
+                                  MAX_PAGE_SIZE, DEFAULT_PAGE_SIZE)
+from app.utils.ingredient_index import get_ingredient_index, refresh_recipe_ingredients, remove_recipe_ingredients
+from app.utils.search import apply_search, index_recipe, unindex_recipe
+from app.utils.facets import get_facet_index, refresh_recipe_facets, remove_recipe_facets
+from app.utils.feeds import FEEDS, get_feeds, position_after
+from app.utils.cache import (cached_response, invalidate, recipe_key, recipe_ratings_key, recipe_comments_key,
+                             recipe_ttl)
+from app.utils.params import parse_id_list
+from app.utils.db_pool import statement_timeout
+from app.internal.routes import internal_only
+from decimal import Decimal
+from sqlalchemy import insert, update, delete, select, exists, func, distinct
+from sqlalchemy.orm import contains_eager, joinedload, selectinload
 
 recipes_bp = Blueprint('recipes', __name__)
 
+# sort=rating: highest average first, more ratings breaking ties
+RATING_ORDER = [(Recipe.average_rating, True), (Recipe.rating_count, True), (Recipe.recipe_id, False)]
+
 def validate_recipe_data(data, is_update=False):
     errors = []
     
@@ -74,40 +91,334 @@ def validate_recipe_data(data, is_update=False):
     
     return errors
 
+def serialize_recipe_summary(r):
+    return {
+        'recipe_id': r.recipe_id,
+        'title': r.title,
+        'description': r.description,
+        'image_url': r.image_url,
+        'author': r.author.username,
+        'average_rating': round(r.average_rating, 1),
+        'ratings_count': r.rating_count
+    }
+
+def to_quantity(value):
+    """Normalize a quantity to the NUMERIC(10, 2) precision stored in the database"""
+    return Decimal(str(value)).quantize(Decimal('0.01'))
+
+def bulk_insert_recipe_ingredients(recipe_id, ingredients):
+    """Insert all ingredient rows for a recipe with a single multi-row INSERT"""
+    if ingredients:
+        db.session.execute(insert(RecipeIngredient), [{
+            'recipe_id': recipe_id,
+            'ingredient_id': ing['ingredient_id'],
+            'quantity': to_quantity(ing['quantity']),
+            'unit': ing['unit']
+        } for ing in ingredients])
+
+def bulk_insert_recipe_dietary_restrictions(recipe_id, dietary_restriction_ids):
+    dietary_restriction_ids = list(dict.fromkeys(dietary_restriction_ids))
+    if dietary_restriction_ids:
+        db.session.execute(insert(RecipeDietaryRestriction), [{
+            'recipe_id': recipe_id,
+            'dietary_restriction_id': dr_id
+        } for dr_id in dietary_restriction_ids])
+
+def sync_recipe_ingredients(recipe_id, ingredients):
+    """
+    Bring a recipe's ingredient rows in line with `ingredients` by diffing
+    against what is stored: identical rows are left alone, rows for the same
+    ingredient are updated in place, and only the remainder is deleted or
+    inserted in bulk.
+    """
+    existing = db.session.query(
+        RecipeIngredient.id,
+        RecipeIngredient.ingredient_id,
+        RecipeIngredient.quantity,
+        RecipeIngredient.unit
+    ).filter(RecipeIngredient.recipe_id == recipe_id).all()
+    
+    # Drop exact matches from both sides
+    unmatched = {}
+    for row in existing:
+        unmatched.setdefault((row.ingredient_id, to_quantity(row.quantity), row.unit), []).append(row.id)
+    to_insert = []
+    for ing in ingredients:
+        key = (ing['ingredient_id'], to_quantity(ing['quantity']), ing['unit'])
+        if unmatched.get(key):
+            unmatched[key].pop()
+        else:
+            to_insert.append(ing)
+    
+    # Reuse leftover rows for the same ingredient as in-place updates
+    leftover_by_ingredient = {}
+    for (ingredient_id, _, _), row_ids in unmatched.items():
+        leftover_by_ingredient.setdefault(ingredient_id, []).extend(row_ids)
+    to_update = []
+    remaining = []
+    for ing in to_insert:
+        row_ids = leftover_by_ingredient.get(ing['ingredient_id'])
+        if row_ids:
+            to_update.append({
+                'id': row_ids.pop(),
+                'quantity': to_quantity(ing['quantity']),
+                'unit': ing['unit']
+            })
+        else:
+            remaining.append(ing)
+    to_delete = [row_id for row_ids in leftover_by_ingredient.values() for row_id in row_ids]
+    
+    if to_delete:
+        db.session.execute(delete(RecipeIngredient).where(RecipeIngredient.id.in_(to_delete)))
+    if to_update:
+        db.session.execute(update(RecipeIngredient), to_update)
+    bulk_insert_recipe_ingredients(recipe_id, remaining)
+
+def sync_recipe_dietary_restrictions(recipe_id, dietary_restriction_ids):
+    existing = {dr_id for (dr_id,) in db.session.query(
+        RecipeDietaryRestriction.dietary_restriction_id
+    ).filter(RecipeDietaryRestriction.recipe_id == recipe_id)}
+    wanted = set(dietary_restriction_ids)
+    
+    removed = existing - wanted
+    if removed:
+        db.session.execute(delete(RecipeDietaryRestriction).where(
+            RecipeDietaryRestriction.recipe_id == recipe_id,
+            RecipeDietaryRestriction.dietary_restriction_id.in_(removed)
+        ))
+    bulk_insert_recipe_dietary_restrictions(
+        recipe_id, [dr_id for dr_id in dietary_restriction_ids if dr_id not in existing]
+    )
+
+def parse_recipe_filters(args):
+    """
+    Parse the filters of the recipe listing into the dict understood by
+    apply_recipe_filters and FacetIndex, returning (filters, errors). Only
+    given filters are set.
+    """
+    filters = {}
+    errors = []
+    
+    for key, param, label in [
+        ('category_ids', 'category', 'Category ID'),
+        ('dietary_restriction_ids', 'dietary', 'Dietary restriction ID'),
+        ('ingredient_ids', 'ingredients', 'Ingredient ID'),
+        ('excluded_ingredient_ids', 'exclude_ingredients', 'Ingredient ID')
+    ]:
+        ids, id_errors = parse_id_list(args.getlist(param), label)
+        errors.extend(id_errors)
+        if ids:
+            filters[key] = ids
+    
+    for key, label in [('max_prep_time', 'Max prep time'), ('max_cook_time', 'Max cook time')]:
+        if key in args:
+            value = args.get(key, type=int)
+            if value is None or value < 0:
+                errors.append(f"{label} must be a non-negative integer")
+            else:
+                filters[key] = value
+    
+    if 'min_rating' in args:
+        value = args.get('min_rating', type=float)
+        if value is None or not 0 <= value <= 5:
+            errors.append("Min rating must be a number between 0 and 5")
+        else:
+            filters['min_rating'] = value
+    
+    return filters, errors
+
+def require_all(model, column, ids):
+    """Subquery of recipe IDs having a row in `model` for every one of `ids`"""
+    return select(model.recipe_id).where(column.in_(ids)) \
+        .group_by(model.recipe_id).having(func.count(distinct(column)) == len(ids))
+
+def apply_recipe_filters(query, filters):
+    """Restrict a Recipe query to the filters parsed by parse_recipe_filters"""
+    if filters.get('category_ids'):
+        query = query.filter(Recipe.category_id.in_(filters['category_ids']))
+    if filters.get('dietary_restriction_ids'):
+        query = query.filter(Recipe.recipe_id.in_(require_all(
+            RecipeDietaryRestriction, RecipeDietaryRestriction.dietary_restriction_id,
+            filters['dietary_restriction_ids']
+        )))
+    if filters.get('ingredient_ids'):
+        query = query.filter(Recipe.recipe_id.in_(require_all(
+            RecipeIngredient, RecipeIngredient.ingredient_id, filters['ingredient_ids']
+        )))
+    if filters.get('excluded_ingredient_ids'):
+        query = query.filter(~exists().where(
+            RecipeIngredient.recipe_id == Recipe.recipe_id,
+            RecipeIngredient.ingredient_id.in_(filters['excluded_ingredient_ids'])
+        ))
+    if 'max_prep_time' in filters:
+        query = query.filter(Recipe.prep_time <= filters['max_prep_time'])
+    if 'max_cook_time' in filters:
+        query = query.filter(Recipe.cook_time <= filters['max_cook_time'])
+    if 'min_rating' in filters:
+        query = query.filter(Recipe.average_rating >= filters['min_rating'])
+    return query
+
 @recipes_bp.route('/', methods=['GET'])
 def get_recipes():
-    category_id = request.args.get('category', type=int)
-    dietary_id = request.args.get('dietary', type=int)
+    filters, errors = parse_recipe_filters(request.args)
+    if errors:
+        return jsonify({'error': 'Validation failed', 'details': errors}), 400
+        
     search = request.args.get('search', '')
+    sort = request.args.get('sort')
+    paginated = 'limit' in request.args or 'after' in request.args
+    with_facets = request.args.get('facets', '').lower() in ('1', 'true')
     
-    query = Recipe.query
+    # Join the author so usernames come back in the same statement
+    query = apply_recipe_filters(
+        Recipe.query.join(Recipe.author).options(contains_eager(Recipe.author)), filters
+    )
     
-    if category_id:
-        query = query.filter_by(category_id=category_id)
-    if dietary_id:
-        query = query.join(RecipeDietaryRestriction).filter_by(dietary_restriction_id=dietary_id)
+    # Facet counts come from the in-memory facet index
+    facets = None
+    if with_facets:
+        candidates = None
+        if search:
+            # Count facets within the search results
+            candidates = {recipe_id for (recipe_id,) in
+                          apply_search(db.session.query(Recipe.recipe_id), search, ranked=False)}
+        facets = get_facet_index().facet_counts(filters, candidates)
     if search:
-        query = query.filter(or_(
-            Recipe.title.ilike(f'%{search}%'),
-            Recipe.description.ilike(f'%{search}%')
-        ))
+        # Rank by relevance unless another ordering was asked for
+        query = apply_search(query, search, ranked=not (paginated or sort))
+    
+    # Keyset pagination mode
+    if paginated:
+        limit, after, errors = parse_page_args(
+            request.args, decode=decode_rating_cursor if sort == 'rating' else decode_cursor
+        )
+        if errors:
+            return jsonify({'error': 'Invalid pagination parameters', 'details': errors}), 400
+            
+        if sort == 'rating':
+            recipes, next_cursor = paginate_ordered(
+                query, RATING_ORDER, limit, after,
+                key=lambda r: (r.average_rating, r.rating_count, r.recipe_id),
+                encode=encode_rating_cursor
+            )
+        else:
+            recipes, next_cursor = paginate_keyset(
+                query, Recipe.created_at, Recipe.recipe_id, limit, after,
+                key=lambda r: (r.created_at, r.recipe_id)
+            )
+        response = {
+            'recipes': [serialize_recipe_summary(r) for r in recipes],
+            'next_cursor': next_cursor
+        }
+        if facets is not None:
+            response['facets'] = facets
+        return jsonify(response)
         
+    if sort == 'rating':
+        query = apply_order(query, RATING_ORDER)
+    
     recipes = query.all()
-    return jsonify([{
-        'recipe_id': r.recipe_id,
-        'title': r.title,
-        'description': r.description,
-        'image_url': r.image_url,
-        'author': r.author.username
-    } for r in recipes])
+    if facets is not None:
+        return jsonify({'recipes': [serialize_recipe_summary(r) for r in recipes], 'facets': facets})
+    return jsonify([serialize_recipe_summary(r) for r in recipes])
+
+@recipes_bp.route('/cookable', methods=['GET'])
+def get_cookable_recipes():
+    """Recipes ranked by how many of their ingredients the caller has on hand"""
+    ingredient_ids, errors = parse_id_list(request.args.getlist('ingredients'), 'Ingredient ID')
+    if not ingredient_ids and not errors:
+        errors.append("At least one ingredient ID is required")
+        
+    max_missing = request.args.get('max_missing', type=int)
+    if max_missing is not None and max_missing < 0:
+        errors.append("Max missing must be a non-negative integer")
+        
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        errors.append(f"Limit must be an integer between 1 and {MAX_PAGE_SIZE}")
+        
+    if errors:
+        return jsonify({'error': 'Validation failed', 'details': errors}), 400
+    
+    matches = get_ingredient_index().match(ingredient_ids, max_missing=max_missing, limit=limit)
+    if not matches:
+        return jsonify([])
+    
+    recipes = Recipe.query.join(Recipe.author).options(contains_eager(Recipe.author)) \
+        .filter(Recipe.recipe_id.in_([m[0] for m in matches])).all()
+    recipes_by_id = {r.recipe_id: r for r in recipes}
+    
+    results = []
+    for recipe_id, matched, missing_ids in matches:
+        recipe = recipes_by_id.get(recipe_id)
+        if recipe is None:
+            continue
+        result = serialize_recipe_summary(recipe)
+        result['matched_ingredients'] = matched
+        result['missing_ingredients'] = len(missing_ids)
+        result['missing_ingredient_ids'] = missing_ids
+        results.append(result)
+    return jsonify(results)
+
+@recipes_bp.route('/feeds/<feed>', methods=['GET'])
+def get_feed(feed):
+    """Page through a precomputed ranking ('trending' or 'top-rated')"""
+    if feed not in FEEDS:
+        return jsonify({'error': f"Feed must be one of: {', '.join(FEEDS)}"}), 404
+        
+    limit, after, errors = parse_page_args(request.args, decode=decode_rank_cursor)
+    if errors:
+        return jsonify({'error': 'Invalid pagination parameters', 'details': errors}), 400
+    
+    # Cursors carry the (score, recipe_id) of the last item shown, not an offset,
+    # since the next page may be served from a recomputed snapshot
+    snapshot = get_feeds().get(feed)
+    start = position_after(snapshot, *after) if after else 0
+    page_ids = snapshot.recipe_ids[start:start + limit]
+    next_cursor = None
+    if start + limit < len(snapshot.recipe_ids):
+        last = start + limit - 1
+        next_cursor = encode_rank_cursor(snapshot.scores[last], snapshot.recipe_ids[last])
+    
+    recipes = Recipe.query.join(Recipe.author).options(contains_eager(Recipe.author)) \
+        .filter(Recipe.recipe_id.in_(page_ids)).all() if page_ids else []
+    recipes_by_id = {r.recipe_id: r for r in recipes}
+    
+    results = []
+    for position, recipe_id in enumerate(page_ids, start=start):
+        recipe = recipes_by_id.get(recipe_id)
+        if recipe is None:
+            continue
+        result = serialize_recipe_summary(recipe)
+        result['score'] = round(snapshot.scores[position], 4)
+        results.append(result)
+    
+    return jsonify({
+        'recipes': results,
+        'next_cursor': next_cursor,
+        'computed_at': snapshot.computed_at
+    })
+
+def load_recipe_detail(recipe_id):
+    """
+    Load a recipe with everything the detail view needs in a fixed number
+    of statements: the recipe joined to its author and category, and one
+    selectin load each for ingredients and dietary restrictions. Rating
+    aggregates are read from the denormalized columns on Recipe.
+    """
+    recipe = Recipe.query.options(
+        joinedload(Recipe.author),
+        joinedload(Recipe.category),
+        selectinload(Recipe.ingredients).joinedload(RecipeIngredient.ingredient),
+        selectinload(Recipe.dietary_restrictions)
+    ).filter(Recipe.recipe_id == recipe_id).first_or_404()
+    
+    return recipe
 
 @recipes_bp.route('/<int:recipe_id>', methods=['GET'])
+@cached_response(recipe_key, ttl=recipe_ttl)
 def get_recipe(recipe_id):
-    recipe = Recipe.query.get_or_404(recipe_id)
-    
-    # Calculate average rating
-    ratings = [r.rating for r in recipe.ratings]
-    avg_rating = sum(ratings) / len(ratings) if ratings else 0
+    recipe = load_recipe_detail(recipe_id)
     
     return jsonify({
         'recipe_id': recipe.recipe_id,
@@ -136,8 +447,8 @@ def get_recipe(recipe_id):
             'dietary_restriction_id': dr.dietary_restriction_id,
             'name': dr.name
         } for dr in recipe.dietary_restrictions],
-        'average_rating': round(avg_rating, 1),
-        'ratings_count': len(ratings),
+        'average_rating': round(recipe.average_rating, 1),
+        'ratings_count': recipe.rating_count,
         'created_at': recipe.created_at,
         'updated_at': recipe.updated_at
     })
@@ -166,30 +477,64 @@ def create_recipe():
         servings=data.get('servings')
     )
     
+    # Flush for the recipe ID, then write child rows in the same transaction
     db.session.add(recipe)
-    db.session.commit()
-    
-    # Add ingredients
-    for ing in data.get('ingredients', []):
-        recipe_ingredient = RecipeIngredient(
-            recipe_id=recipe.recipe_id,
-            ingredient_id=ing['ingredient_id'],
-            quantity=ing['quantity'],
-            unit=ing['unit']
-        )
-        db.session.add(recipe_ingredient)
+    db.session.flush()
     
-    # Add dietary restrictions
-    for dr_id in data.get('dietary_restrictions', []):
-        rdr = RecipeDietaryRestriction(
-            recipe_id=recipe.recipe_id,
-            dietary_restriction_id=dr_id
-        )
-        db.session.add(rdr)
+    bulk_insert_recipe_ingredients(recipe.recipe_id, data.get('ingredients', []))
+    bulk_insert_recipe_dietary_restrictions(recipe.recipe_id, data.get('dietary_restrictions', []))
         
     db.session.commit()
+    index_recipe(recipe)
+    refresh_recipe_ingredients(recipe.recipe_id, [ing['ingredient_id'] for ing in data.get('ingredients', [])])
+    refresh_recipe_facets([recipe.recipe_id])
     return jsonify({'message': 'Recipe created successfully', 'recipe_id': recipe.recipe_id}), 201
 
+@recipes_bp.route('/import', methods=['POST'])
+@jwt_required()
+def import_recipes():
+    """Bulk-create recipes from an uploaded JSONL or CSV file"""
+    from app.recipes.importer import RecipeImporter, detect_format, read_records
+    
+    upload = request.files.get('file')
+    if upload:
+        stream, filename, content_type = upload.stream, upload.filename, upload.mimetype
+    elif request.content_type and not request.content_type.startswith('multipart/'):
+        stream, filename, content_type = request.stream, None, request.content_type
+    else:
+        return jsonify({'error': 'No file provided'}), 400
+        
+    fmt = request.args.get('format') or detect_format(filename, content_type)
+    if fmt not in ('jsonl', 'csv'):
+        return jsonify({'error': "Format must be 'jsonl' or 'csv'"}), 400
+    
+    importer = RecipeImporter(get_jwt_identity())
+    result = importer.run(read_records(stream, fmt))
+    return jsonify(result), 201 if result['imported'] else 200
+
+@recipes_bp.route('/export', methods=['GET'])
+@internal_only
+@statement_timeout(0)
+def export_recipes():
+    """Stream recipes or an interaction table as NDJSON, for analytics jobs only"""
+    from app.recipes.exporter import EXPORT_TYPES, iter_export_records, iter_ndjson
+    
+    export_type = request.args.get('type', 'recipes')
+    if export_type not in EXPORT_TYPES:
+        return jsonify({'error': f"Type must be one of: {', '.join(EXPORT_TYPES)}"}), 400
+    
+    compress = request.accept_encodings['gzip'] > 0
+    records = iter_export_records(export_type)
+    response = Response(
+        stream_with_context(iter_ndjson(records, current_app.json.dumps, compress=compress)),
+        mimetype='application/x-ndjson'
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename="{export_type}.ndjson"'
+    response.vary.add('Accept-Encoding')
+    if compress:
+        response.content_encoding = 'gzip'
+    return response
+
 @recipes_bp.route('/<int:recipe_id>', methods=['PUT'])
 @jwt_required()
 def update_recipe(recipe_id):
@@ -212,35 +557,20 @@ def update_recipe(recipe_id):
         if key in data:
             setattr(recipe, key, data[key])
             
-    # Update ingredients if provided
+    # Update ingredients if provided, touching only rows that changed
     if 'ingredients' in data:
-        # Remove existing ingredients
-        RecipeIngredient.query.filter_by(recipe_id=recipe_id).delete()
-        
-        # Add new ingredients
-        for ing in data['ingredients']:
-            recipe_ingredient = RecipeIngredient(
-                recipe_id=recipe_id,
-                ingredient_id=ing['ingredient_id'],
-                quantity=ing['quantity'],
-                unit=ing['unit']
-            )
-            db.session.add(recipe_ingredient)
+        sync_recipe_ingredients(recipe_id, data['ingredients'])
     
     # Update dietary restrictions if provided
     if 'dietary_restrictions' in data:
-        # Remove existing restrictions
-        RecipeDietaryRestriction.query.filter_by(recipe_id=recipe_id).delete()
-        
-        # Add new restrictions
-        for dr_id in data['dietary_restrictions']:
-            rdr = RecipeDietaryRestriction(
-                recipe_id=recipe_id,
-                dietary_restriction_id=dr_id
-            )
-            db.session.add(rdr)
+        sync_recipe_dietary_restrictions(recipe_id, data['dietary_restrictions'])
             
     db.session.commit()
+    index_recipe(recipe)
+    if 'ingredients' in data:
+        refresh_recipe_ingredients(recipe_id, [ing['ingredient_id'] for ing in data['ingredients']])
+    refresh_recipe_facets([recipe_id])
+    invalidate(recipe_key(recipe_id))
     return jsonify({'message': 'Recipe updated successfully'})
 
 @recipes_bp.route('/<int:recipe_id>', methods=['DELETE'])
@@ -252,4 +582,8 @@ def delete_recipe(recipe_id):
         
     db.session.delete(recipe)
     db.session.commit()
+    unindex_recipe(recipe_id)
+    remove_recipe_ingredients(recipe_id)
+    remove_recipe_facets(recipe_id)
+    invalidate(recipe_key(recipe_id), recipe_ratings_key(recipe_id), recipe_comments_key(recipe_id))
     return jsonify({'message': 'Recipe deleted successfully'}) 
\ No newline at end of file
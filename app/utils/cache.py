@@ -0,0 +1,203 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import wraps
+from urllib.parse import urlencode
+from flask import Response, current_app, g, has_app_context, request
+from flask.json.tag import TaggedJSONSerializer
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+class MemoryCache:
+    """Thread-safe in-process LRU cache with per-entry TTL"""
+
+    def __init__(self, max_entries=1024, default_ttl=300):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (ttl or self.default_ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class RedisCache:
+    """
+    Cache backed by Redis or any server speaking its protocol. Values are
+    stored as tagged JSON (the format of Flask's session cookie), which
+    round-trips the bytes, tuples and datetimes in cached responses without
+    letting whoever can write to Redis run code in the workers.
+    """
+
+    def __init__(self, url, default_ttl=300, prefix='cooking:'):
+        import redis
+        self._client = redis.Redis.from_url(url)
+        self._serializer = TaggedJSONSerializer()
+        self.default_ttl = default_ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self._client.get(self.prefix + key)
+        if raw is None:
+            return None
+        try:
+            return self._serializer.loads(raw)
+        except ValueError:
+            # Written in another format (e.g. by an older release); treat as a miss
+            return None
+
+    def set(self, key, value, ttl=None):
+        self._client.set(self.prefix + key, self._serializer.dumps(value), ex=ttl or self.default_ttl)
+
+    def delete(self, *keys):
+        if keys:
+            self._client.delete(*(self.prefix + key for key in keys))
+
+    def clear(self):
+        for key in self._client.scan_iter(match=self.prefix + '*'):
+            self._client.delete(key)
+
+def init_cache(app):
+    ttl = app.config['CACHE_DEFAULT_TTL']
+    if app.config['CACHE_BACKEND'] == 'redis':
+        backend = RedisCache(app.config['CACHE_REDIS_URL'], default_ttl=ttl)
+    else:
+        backend = MemoryCache(max_entries=app.config['CACHE_MAX_ENTRIES'], default_ttl=ttl)
+    app.extensions['cache'] = backend
+
+def get_cache():
+    return current_app.extensions['cache']
+
+# Entries are stored under their key's current generation, so invalidating
+# a key drops every variant cached for it (e.g. each page of a listing)
+GENERATION_PREFIX = 'generation:'
+# Set for REPLICA_STICKY_SECONDS after a key is invalidated, while read
+# replicas may still lag the write: misses for the key read from the primary
+RECENT_WRITE_PREFIX = 'written:'
+
+def entry_key(backend, key, ttl=None):
+    generation = backend.get(GENERATION_PREFIX + key)
+    if generation is None:
+        generation = time.time_ns()
+        backend.set(GENERATION_PREFIX + key, generation, ttl)
+    variant = urlencode(sorted(request.args.items(multi=True)))
+    return f"{key}@{generation}?{variant}"
+
+def cached_response(key, ttl=None):
+    """
+    Serve a view's JSON body from the cache with a strong ETag and a
+    Last-Modified of when the body was built, answering matching
+    conditional requests with 304 without calling the view. Entries vary
+    on the query string. `key` may be a callable taking the view's keyword
+    arguments, for per-row entries, and `ttl` a callable returning the TTL.
+    Only 200 responses are stored.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            backend = get_cache()
+            entry_ttl = ttl() if callable(ttl) else ttl
+            base_key = key(**kwargs) if callable(key) else key
+            cache_key = entry_key(backend, base_key, entry_ttl)
+            entry = backend.get(cache_key)
+            if entry is None:
+                if backend.get(RECENT_WRITE_PREFIX + base_key):
+                    # A replica may not have the write yet; don't cache its stale rows
+                    g.replica_bind = None
+                built_at = datetime.now(timezone.utc).replace(microsecond=0)
+                response = current_app.make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                body = response.get_data()
+                entry = (body, response.mimetype, hashlib.sha1(body).hexdigest(), built_at)
+                backend.set(cache_key, entry, entry_ttl)
+
+            body, mimetype, etag, last_modified = entry
+            response = Response(body, mimetype=mimetype)
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            response.cache_control.no_cache = True
+            return response.make_conditional(request)
+        return decorated
+    return decorator
+
+# Per-recipe cached responses, invalidated explicitly by the write endpoints.
+# Invalidation only reaches the process's own memory backend, so their TTL
+# (CACHE_RECIPE_TTL) bounds how long other workers serve a stale entry.
+def recipe_ttl():
+    return current_app.config['CACHE_RECIPE_TTL']
+
+# Category, ingredient and dietary restriction lists, invalidated on write
+# with the same single-process reach (CACHE_LOOKUP_TTL)
+def lookup_ttl():
+    return current_app.config['CACHE_LOOKUP_TTL']
+
+def recipe_key(recipe_id):
+    return f"recipe:{recipe_id}"
+
+def recipe_ratings_key(recipe_id):
+    return f"recipe:{recipe_id}:ratings"
+
+def recipe_comments_key(recipe_id):
+    return f"recipe:{recipe_id}:comments"
+
+# Model class -> cache keys to drop whenever a row of that model is written.
+# A key may be a callable taking the written object, for per-row entries.
+_invalidation_map = {}
+
+def invalidate_on_write(model, *keys):
+    _invalidation_map.setdefault(model, set()).update(keys)
+
+def invalidate(*keys):
+    if has_app_context():
+        backend = get_cache()
+        backend.delete(*keys, *(GENERATION_PREFIX + key for key in keys))
+        if 'replica_router' in current_app.extensions:
+            for key in keys:
+                backend.set(RECENT_WRITE_PREFIX + key, True, current_app.config['REPLICA_STICKY_SECONDS'])
+
+@event.listens_for(Session, 'after_flush')
+def _collect_invalidations(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        keys = _invalidation_map.get(type(obj))
+        if keys:
+            session.info.setdefault('cache_invalidations', set()).update(
+                key(obj) if callable(key) else key for key in keys
+            )
+
+@event.listens_for(Session, 'after_commit')
+def _apply_invalidations(session):
+    keys = session.info.pop('cache_invalidations', None)
+    if keys:
+        invalidate(*keys)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_invalidations(session):
+    session.info.pop('cache_invalidations', None)
@@ -0,0 +1,139 @@
+import threading
+import time
+from functools import wraps
+from flask import current_app, g, has_request_context
+from sqlalchemy import event, exc as sa_exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool, QueuePool
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool reporting how long each checkout waited for a connection"""
+
+    wait_observer = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except sa_exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            if self.wait_observer:
+                self.wait_observer(time.perf_counter() - start, timed_out)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.wait_observer = self.wait_observer
+        return pool
+
+class PoolMetrics:
+    """Counters for one engine's connection pool, updated from pool events"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.checkout_timeouts = 0
+        self.waits = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_wait(self, seconds, timed_out):
+        with self._lock:
+            self.waits += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            if timed_out:
+                self.checkout_timeouts += 1
+
+    def increment(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def attach(self, engine):
+        for name, counter in [('connect', 'connects'), ('checkout', 'checkouts'),
+                              ('checkin', 'checkins'), ('invalidate', 'invalidations')]:
+            event.listen(engine, name, lambda *args, counter=counter: self.increment(counter))
+        if isinstance(engine.pool, InstrumentedQueuePool):
+            engine.pool.wait_observer = self.record_wait
+
+    def snapshot(self, pool):
+        with self._lock:
+            stats = {
+                'pool_class': type(pool).__name__,
+                'in_use': self.checkouts - self.checkins,
+                'connects': self.connects,
+                'checkouts': self.checkouts,
+                'invalidations': self.invalidations,
+                'checkout_timeouts': self.checkout_timeouts,
+                'checkout_wait_ms': {
+                    'total': round(self.wait_total * 1000, 3),
+                    'max': round(self.wait_max * 1000, 3),
+                    'avg': round(self.wait_total * 1000 / self.waits, 3) if self.waits else 0
+                }
+            }
+        if isinstance(pool, QueuePool):
+            stats.update({
+                'size': pool.size(),
+                'checked_in': pool.checkedin(),
+                'checked_out': pool.checkedout(),
+                'overflow': pool.overflow()
+            })
+        return stats
+
+def build_engine_options(config, url=None):
+    """
+    Engine options from the DB_* settings for `url` (the primary database by
+    default). With DB_POOLER set to 'pgbouncer', connections aren't pooled
+    in-process (NullPool) since the external pooler already does it.
+    """
+    options = {'pool_pre_ping': config['DB_POOL_PRE_PING']}
+    if config['DB_POOLER'] == 'pgbouncer':
+        options['poolclass'] = NullPool
+    elif not make_url(url or config['SQLALCHEMY_DATABASE_URI']).drivername.startswith('sqlite'):
+        options.update({
+            'poolclass': InstrumentedQueuePool,
+            'pool_size': config['DB_POOL_SIZE'],
+            'max_overflow': config['DB_MAX_OVERFLOW'],
+            'pool_timeout': config['DB_POOL_TIMEOUT'],
+            'pool_recycle': config['DB_POOL_RECYCLE']
+        })
+    return options
+
+def init_pool_metrics(app):
+    """Attach a PoolMetrics to every engine, keyed by bind key (None for the primary)"""
+    from app import db
+    metrics = {}
+    with app.app_context():
+        for bind_key, engine in db.engines.items():
+            metrics[bind_key] = PoolMetrics()
+            metrics[bind_key].attach(engine)
+    app.extensions['db_pool_metrics'] = metrics
+
+def get_pool_metrics(bind_key=None):
+    return current_app.extensions['db_pool_metrics'][bind_key]
+
+def statement_timeout(milliseconds):
+    """Override DB_STATEMENT_TIMEOUT for a view; 0 disables it"""
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            g.statement_timeout = milliseconds
+            return f(*args, **kwargs)
+        return decorated
+    return decorator
+
+@event.listens_for(Session, 'after_begin')
+def _apply_statement_timeout(session, transaction, connection):
+    # SET LOCAL lasts for the transaction only, which is safe behind
+    # transaction-pooling pgbouncer
+    if not has_request_context() or connection.dialect.name != 'postgresql':
+        return
+    timeout = g.get('statement_timeout', current_app.config['DB_STATEMENT_TIMEOUT'])
+    if timeout:
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout)}")
@@ -0,0 +1,231 @@
+import threading
+import time
+from collections import Counter, namedtuple
+from flask import current_app
+from app import db
+from app.utils.index_refresher import IndexRefresher
+
+TIME_BUCKETS = (15, 30, 60, 120)
+RATING_BUCKETS = (4, 3, 2, 1)
+
+RecipeFacets = namedtuple('RecipeFacets', [
+    'category_id', 'prep_time', 'cook_time', 'rating_sum', 'rating_count',
+    'dietary_restriction_ids', 'ingredient_ids'
+])
+
+class FacetIndex:
+    """
+    In-process facet values and posting lists for counting the facets of a
+    filtered recipe listing (the listing itself is filtered in SQL).
+
+    Category, dietary restriction and ingredient filters are set
+    intersections over posting lists; time and rating filters are checked
+    against the matched recipes only. Every facet's counts are tallied from
+    these sets, so no per-facet GROUP BY query is needed.
+
+    Built on first use and rebuilt periodically by an IndexRefresher, so
+    writes made by other processes show up. Writes in this process are
+    applied immediately via refresh_recipe_facets and adjust_recipe_rating.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._recipes = {}
+        self._by_category = {}
+        self._by_dietary = {}
+        self._by_ingredient = {}
+        self.built_at = None
+
+    @property
+    def built(self):
+        return self.built_at is not None
+
+    def build(self, recipes):
+        """Build from a {recipe_id: RecipeFacets} mapping, then swap the result in"""
+        index = FacetIndex()
+        for recipe_id, facets in recipes.items():
+            index._add(recipe_id, facets)
+        with self._lock:
+            self._recipes = index._recipes
+            self._by_category = index._by_category
+            self._by_dietary = index._by_dietary
+            self._by_ingredient = index._by_ingredient
+            self.built_at = time.monotonic()
+
+    def set_recipe(self, recipe_id, facets):
+        with self._lock:
+            self._remove(recipe_id)
+            self._add(recipe_id, facets)
+
+    def remove_recipe(self, recipe_id):
+        with self._lock:
+            self._remove(recipe_id)
+
+    def adjust_rating(self, recipe_id, sum_delta, count_delta):
+        with self._lock:
+            facets = self._recipes.get(recipe_id)
+            if facets is not None:
+                self._recipes[recipe_id] = facets._replace(
+                    rating_sum=facets.rating_sum + sum_delta,
+                    rating_count=facets.rating_count + count_delta
+                )
+
+    def _add(self, recipe_id, facets):
+        self._recipes[recipe_id] = facets
+        if facets.category_id is not None:
+            self._by_category.setdefault(facets.category_id, set()).add(recipe_id)
+        for dr_id in facets.dietary_restriction_ids:
+            self._by_dietary.setdefault(dr_id, set()).add(recipe_id)
+        for ingredient_id in facets.ingredient_ids:
+            self._by_ingredient.setdefault(ingredient_id, set()).add(recipe_id)
+
+    def _remove(self, recipe_id):
+        facets = self._recipes.pop(recipe_id, None)
+        if facets is None:
+            return
+        postings = [(self._by_category, facets.category_id)]
+        postings += [(self._by_dietary, dr_id) for dr_id in facets.dietary_restriction_ids]
+        postings += [(self._by_ingredient, ing_id) for ing_id in facets.ingredient_ids]
+        for index, key in postings:
+            recipe_ids = index.get(key)
+            if recipe_ids is None:
+                continue
+            recipe_ids.discard(recipe_id)
+            if not recipe_ids:
+                del index[key]
+
+    def _match(self, filters, candidates=None, skip=None):
+        """Recipe IDs passing every filter except the one named `skip`"""
+        sets = []
+        if filters.get('category_ids') and skip != 'category_ids':
+            sets.append(set().union(*(self._by_category.get(c, ()) for c in filters['category_ids'])))
+        for dr_id in filters.get('dietary_restriction_ids', ()):
+            sets.append(self._by_dietary.get(dr_id, set()))
+        for ingredient_id in filters.get('ingredient_ids', ()):
+            sets.append(self._by_ingredient.get(ingredient_id, set()))
+        if candidates is not None:
+            sets.append(candidates)
+
+        if sets:
+            sets.sort(key=len)
+            matched = sets[0].intersection(*sets[1:])
+        else:
+            matched = set(self._recipes)
+
+        for ingredient_id in filters.get('excluded_ingredient_ids', ()):
+            matched -= self._by_ingredient.get(ingredient_id, set())
+
+        checks = []
+        if filters.get('max_prep_time') is not None and skip != 'max_prep_time':
+            checks.append(lambda f: f.prep_time is not None and f.prep_time <= filters['max_prep_time'])
+        if filters.get('max_cook_time') is not None and skip != 'max_cook_time':
+            checks.append(lambda f: f.cook_time is not None and f.cook_time <= filters['max_cook_time'])
+        if filters.get('min_rating') is not None and skip != 'min_rating':
+            checks.append(lambda f: average_rating(f) >= filters['min_rating'])
+        if checks:
+            matched = {recipe_id for recipe_id in matched
+                       if all(check(self._recipes[recipe_id]) for check in checks)}
+        return matched
+
+    def facet_counts(self, filters, candidates=None):
+        """
+        Counts for each facet value. Category, time and rating counts ignore
+        their own filter, so they show what choosing another value would
+        return; dietary restriction counts narrow the current results, since
+        those filters are ANDed.
+        """
+        with self._lock:
+            matched = self._match(filters, candidates)
+            others = {key: self._match(filters, candidates, skip=key) if filters.get(key) is not None else matched
+                      for key in ('category_ids', 'max_prep_time', 'max_cook_time', 'min_rating')}
+
+            categories = Counter(self._recipes[r].category_id for r in others['category_ids'])
+            categories.pop(None, None)
+            dietary = Counter(dr_id for r in matched for dr_id in self._recipes[r].dietary_restriction_ids)
+
+            return {
+                'total': len(matched),
+                'categories': [{'category_id': c, 'count': n} for c, n in categories.most_common()],
+                'dietary_restrictions': [{'dietary_restriction_id': d, 'count': n} for d, n in dietary.most_common()],
+                'max_prep_time': self._bucket_counts(others['max_prep_time'], 'prep_time', TIME_BUCKETS),
+                'max_cook_time': self._bucket_counts(others['max_cook_time'], 'cook_time', TIME_BUCKETS),
+                'min_rating': [{'value': b, 'count': sum(1 for r in others['min_rating']
+                                                         if average_rating(self._recipes[r]) >= b)}
+                               for b in RATING_BUCKETS]
+            }
+
+    def _bucket_counts(self, recipe_ids, field, buckets):
+        values = [getattr(self._recipes[r], field) for r in recipe_ids]
+        return [{'value': b, 'count': sum(1 for v in values if v is not None and v <= b)}
+                for b in buckets]
+
+def average_rating(facets):
+    return facets.rating_sum / facets.rating_count if facets.rating_count else 0
+
+def load_recipe_facets(recipe_ids=None):
+    """Read facet values for the given recipes (all when None) from the database"""
+    from app.models import Recipe, RecipeIngredient, RecipeDietaryRestriction
+
+    def scoped(query, column):
+        return query if recipe_ids is None else query.filter(column.in_(recipe_ids))
+
+    dietary = {}
+    for recipe_id, dr_id in scoped(db.session.query(
+        RecipeDietaryRestriction.recipe_id, RecipeDietaryRestriction.dietary_restriction_id
+    ), RecipeDietaryRestriction.recipe_id).yield_per(5000):
+        dietary.setdefault(recipe_id, set()).add(dr_id)
+
+    ingredients = {}
+    for recipe_id, ingredient_id in scoped(db.session.query(
+        RecipeIngredient.recipe_id, RecipeIngredient.ingredient_id
+    ), RecipeIngredient.recipe_id).yield_per(5000):
+        ingredients.setdefault(recipe_id, set()).add(ingredient_id)
+
+    rows = scoped(db.session.query(
+        Recipe.recipe_id, Recipe.category_id, Recipe.prep_time, Recipe.cook_time,
+        Recipe.rating_sum, Recipe.rating_count
+    ), Recipe.recipe_id).yield_per(5000)
+    return {
+        row.recipe_id: RecipeFacets(
+            row.category_id, row.prep_time, row.cook_time, row.rating_sum or 0, row.rating_count or 0,
+            frozenset(dietary.get(row.recipe_id, ())), frozenset(ingredients.get(row.recipe_id, ()))
+        )
+        for row in rows
+    }
+
+def reload_recipe_facets(index, recipe_ids):
+    loaded = load_recipe_facets(recipe_ids)
+    for recipe_id in recipe_ids:
+        if recipe_id in loaded:
+            index.set_recipe(recipe_id, loaded[recipe_id])
+        else:
+            index.remove_recipe(recipe_id)
+
+def init_facet_index(app):
+    index = FacetIndex()
+    app.extensions['facet_index'] = IndexRefresher(
+        app, index,
+        load=load_recipe_facets,
+        reload=lambda recipe_ids: reload_recipe_facets(index, recipe_ids),
+        interval=app.config['FACET_INDEX_TTL'],
+        name='facet index',
+        run_async=app.config['INDEX_REFRESH_ASYNC']
+    )
+
+def get_facet_index():
+    return current_app.extensions['facet_index'].get()
+
+def refresh_recipe_facets(recipe_ids):
+    """Reload the facet values of recipes after they are written"""
+    if recipe_ids:
+        current_app.extensions['facet_index'].update(
+            recipe_ids, lambda index: reload_recipe_facets(index, recipe_ids))
+
+def remove_recipe_facets(recipe_id):
+    current_app.extensions['facet_index'].update(
+        [recipe_id], lambda index: index.remove_recipe(recipe_id))
+
+def adjust_recipe_rating(recipe_id, sum_delta, count_delta):
+    """Mirror Recipe.apply_rating_delta in the index"""
+    current_app.extensions['facet_index'].update(
+        [recipe_id], lambda index: index.adjust_rating(recipe_id, sum_delta, count_delta))
@@ -0,0 +1,145 @@
+import threading
+import time
+from bisect import bisect_right
+from collections import namedtuple
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import literal, select, union_all
+from app import db
+
+FEEDS = ('trending', 'top-rated')
+FEED_SIZE = 1000
+
+# Trending weight of each interaction; older ones decay by half every half-life
+TRENDING_WEIGHTS = {'rating': 1.0, 'comment': 1.5, 'favorite': 2.0}
+# Interactions older than this many half-lives contribute under 2% and are skipped
+TRENDING_WINDOW_HALF_LIVES = 6
+
+FeedSnapshot = namedtuple('FeedSnapshot', ['recipe_ids', 'scores', 'computed_at'])
+
+def compute_trending(half_life_hours, now=None):
+    """Rank recipes by time-decayed rating, comment and favorite activity"""
+    from app.models import Rating, Comment, Favorite
+
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(hours=half_life_hours * TRENDING_WINDOW_HALF_LIVES)
+    events = union_all(*(
+        select(model.recipe_id, model.created_at, literal(kind).label('kind')).where(model.created_at >= cutoff)
+        for kind, model in [('rating', Rating), ('comment', Comment), ('favorite', Favorite)]
+    ))
+
+    scores = {}
+    for recipe_id, created_at, kind in db.session.execute(events).yield_per(5000):
+        age_hours = max((now - created_at).total_seconds() / 3600, 0)
+        scores[recipe_id] = scores.get(recipe_id, 0) + TRENDING_WEIGHTS[kind] * 0.5 ** (age_hours / half_life_hours)
+    return scores
+
+def compute_top_rated(prior_weight):
+    """
+    Rank rated recipes by Bayesian average: each recipe's ratings are
+    blended with `prior_weight` virtual ratings at the site-wide mean, so a
+    single 5-star rating does not outrank a long record of 4.8s.
+    """
+    from app.models import Recipe
+
+    rows = db.session.query(Recipe.recipe_id, Recipe.rating_sum, Recipe.rating_count) \
+        .filter(Recipe.rating_count > 0).all()
+    total_count = sum(row.rating_count for row in rows)
+    if not total_count:
+        return {}
+    mean = sum(row.rating_sum for row in rows) / total_count
+    return {
+        row.recipe_id: (prior_weight * mean + row.rating_sum) / (prior_weight + row.rating_count)
+        for row in rows
+    }
+
+def make_snapshot(scores, computed_at):
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:FEED_SIZE]
+    return FeedSnapshot(
+        recipe_ids=[recipe_id for recipe_id, _ in ranked],
+        scores=[score for _, score in ranked],
+        computed_at=computed_at
+    )
+
+def position_after(snapshot, score, recipe_id):
+    """
+    Index of the first entry ranked after (score, recipe_id). Works for
+    positions taken from any snapshot, so paging continues correctly across
+    refreshes and workers holding different snapshots.
+    """
+    return bisect_right(range(len(snapshot.recipe_ids)), (-score, recipe_id),
+                        key=lambda i: (-snapshot.scores[i], snapshot.recipe_ids[i]))
+
+class FeedRefresher:
+    """
+    Keeps ranked recipe feeds as in-memory snapshots, recomputed every
+    `interval` seconds by a background thread so requests only slice a
+    precomputed list. The first read computes the snapshots and starts the
+    thread; with run_async disabled, stale snapshots are recomputed inline
+    by the next read instead.
+    """
+
+    def __init__(self, app, interval=300, half_life_hours=24, prior_weight=5, run_async=True):
+        self.app = app
+        self.interval = interval
+        self.half_life_hours = half_life_hours
+        self.prior_weight = prior_weight
+        self.run_async = run_async
+        self._snapshots = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def get(self, feed):
+        if self.run_async:
+            self._ensure_thread()
+        snapshot = self._snapshots.get(feed)
+        if snapshot is None or (not self.run_async and self._is_stale(snapshot)):
+            with self._lock:
+                snapshot = self._snapshots.get(feed)
+                if snapshot is None or (not self.run_async and self._is_stale(snapshot)):
+                    self.refresh()
+                    snapshot = self._snapshots[feed]
+        return snapshot
+
+    def refresh(self):
+        now = datetime.utcnow()
+        # Swap in whole snapshots so readers never see a partial ranking
+        self._snapshots = {
+            'trending': make_snapshot(compute_trending(self.half_life_hours, now), now),
+            'top-rated': make_snapshot(compute_top_rated(self.prior_weight), now)
+        }
+
+    def _is_stale(self, snapshot):
+        return datetime.utcnow() - snapshot.computed_at >= timedelta(seconds=self.interval)
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='feed-refresher', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        # The first read computes the initial snapshots inline
+        while True:
+            time.sleep(self.interval)
+            with self.app.app_context():
+                try:
+                    with self._lock:
+                        self.refresh()
+                except Exception:
+                    current_app.logger.exception("Feed refresh failed")
+                finally:
+                    db.session.remove()
+
+def init_feeds(app):
+    app.extensions['feeds'] = FeedRefresher(
+        app,
+        interval=app.config['FEED_REFRESH_INTERVAL'],
+        half_life_hours=app.config['FEED_TRENDING_HALF_LIFE'],
+        prior_weight=app.config['FEED_RATING_PRIOR'],
+        run_async=app.config['FEED_REFRESH_ASYNC']
+    )
+
+def get_feeds():
+    return current_app.extensions['feeds']
@@ -0,0 +1,60 @@
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from app import db
+from app.utils.upload import get_uploader
+
+class ProfileImageProcessor:
+    """
+    Accepts profile image uploads and renders/stores them off the request.
+
+    The request only spools the upload to a temporary file and enqueues a
+    job; a worker pool decodes, resizes and encodes the variants, uploads
+    them and then points the user's profile_image at the result. With
+    run_async disabled, jobs run inline (useful for tests).
+    """
+
+    def __init__(self, app, max_workers=2, run_async=True):
+        self.app = app
+        self.run_async = run_async
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='image-jobs')
+
+    def submit(self, user_id, file):
+        fd, path = tempfile.mkstemp(prefix='profile-image-')
+        with os.fdopen(fd, 'wb') as spool:
+            file.save(spool)
+
+        if self.run_async:
+            return self._executor.submit(self.process, user_id, path)
+        return self.process(user_id, path)
+
+    def process(self, user_id, path):
+        from app.models import User
+
+        with self.app.app_context():
+            try:
+                with open(path, 'rb') as f:
+                    profile_image_url = get_uploader().upload_variants(f)
+
+                user = db.session.get(User, user_id)
+                if user:
+                    user.profile_image = profile_image_url
+                    db.session.commit()
+                return profile_image_url
+            except Exception:
+                db.session.rollback()
+                current_app.logger.exception("Profile image processing failed for user %s", user_id)
+            finally:
+                os.remove(path)
+                db.session.remove()
+
+def init_image_processor(app):
+    app.extensions['image_processor'] = ProfileImageProcessor(
+        app,
+        max_workers=app.config['IMAGE_WORKERS'],
+        run_async=app.config['IMAGE_PROCESSING_ASYNC']
+    )
+
+def get_image_processor():
+    return current_app.extensions['image_processor']
@@ -0,0 +1,82 @@
+import threading
+import time
+from flask import current_app
+from app import db
+
+class IndexRefresher:
+    """
+    Keeps an in-process recipe index current. The first read builds it
+    inline, one caller at a time while the others wait; after that a
+    background thread rebuilds it every `interval` seconds and swaps the
+    result in, so requests never pay for the full scan. With run_async
+    disabled, a stale index is rebuilt by the next read instead.
+
+    `load()` reads the whole index from the database and `reload(recipe_ids)`
+    re-reads the given recipes into the built index. Writes in this process
+    go through update(); recipes written while a rebuild is loading are
+    reloaded once it has been swapped in, so the rebuild can't undo them.
+    """
+
+    def __init__(self, app, index, load, reload, interval=60, name='index', run_async=True):
+        self.app = app
+        self.index = index
+        self.load = load
+        self.reload = reload
+        self.interval = interval
+        self.name = name
+        self.run_async = run_async
+        self._build_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._written = None
+        self._thread = None
+
+    def get(self):
+        if not self.index.built or (not self.run_async and self._is_stale()):
+            with self._build_lock:
+                if not self.index.built or (not self.run_async and self._is_stale()):
+                    self.rebuild()
+        if self.run_async:
+            self._ensure_thread()
+        return self.index
+
+    def rebuild(self):
+        with self._lock:
+            self._written = set()
+        try:
+            self.index.build(self.load())
+        finally:
+            with self._lock:
+                written, self._written = self._written, None
+        if written:
+            self.reload(written)
+
+    def update(self, recipe_ids, apply):
+        """Record a write to `recipe_ids` and apply it with `apply(index)` once the index is built"""
+        with self._lock:
+            if self._written is not None:
+                self._written.update(recipe_ids)
+        if self.index.built:
+            apply(self.index)
+
+    def _is_stale(self):
+        return time.monotonic() - self.index.built_at >= self.interval
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name=f'{self.name}-refresher', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        # The first read builds the index inline
+        while True:
+            time.sleep(self.interval)
+            with self.app.app_context():
+                try:
+                    with self._build_lock:
+                        self.rebuild()
+                except Exception:
+                    current_app.logger.exception("Rebuilding the %s failed", self.name)
+                finally:
+                    db.session.remove()
@@ -0,0 +1,128 @@
+import threading
+import time
+from flask import current_app
+from app import db
+from app.utils.index_refresher import IndexRefresher
+
+class IngredientIndex:
+    """
+    In-process ingredient -> recipe posting lists used to rank recipes by how
+    much of their ingredient list a user already has on hand.
+
+    Built from recipe_ingredients on first use and rebuilt periodically by an
+    IndexRefresher, so writes made by other processes (other workers, the
+    import command) show up. Writes in this process are applied immediately
+    via set_recipe/remove_recipe.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = {}
+        self._recipe_ingredients = {}
+        self.built_at = None
+
+    @property
+    def built(self):
+        return self.built_at is not None
+
+    def build(self, rows):
+        """Build from (recipe_id, ingredient_id) rows, then swap the result in"""
+        postings = {}
+        recipe_ingredients = {}
+        for recipe_id, ingredient_id in rows:
+            postings.setdefault(ingredient_id, set()).add(recipe_id)
+            recipe_ingredients.setdefault(recipe_id, set()).add(ingredient_id)
+        with self._lock:
+            self._postings = postings
+            self._recipe_ingredients = recipe_ingredients
+            self.built_at = time.monotonic()
+
+    def set_recipe(self, recipe_id, ingredient_ids):
+        with self._lock:
+            self._remove(recipe_id)
+            ingredient_ids = set(ingredient_ids)
+            if not ingredient_ids:
+                return
+            self._recipe_ingredients[recipe_id] = ingredient_ids
+            for ingredient_id in ingredient_ids:
+                self._postings.setdefault(ingredient_id, set()).add(recipe_id)
+
+    def remove_recipe(self, recipe_id):
+        with self._lock:
+            self._remove(recipe_id)
+
+    def _remove(self, recipe_id):
+        for ingredient_id in self._recipe_ingredients.pop(recipe_id, ()):
+            postings = self._postings.get(ingredient_id)
+            if postings is None:
+                continue
+            postings.discard(recipe_id)
+            if not postings:
+                del self._postings[ingredient_id]
+
+    def match(self, available, max_missing=None, limit=None):
+        """
+        Rank recipes sharing at least one ingredient with `available`.
+
+        Returns (recipe_id, matched, missing_ids) tuples ordered by fewest
+        missing ingredients, then most matched, then recipe id.
+        """
+        available = set(available)
+        with self._lock:
+            matched = {}
+            for ingredient_id in available:
+                for recipe_id in self._postings.get(ingredient_id, ()):
+                    matched[recipe_id] = matched.get(recipe_id, 0) + 1
+
+            ranked = []
+            for recipe_id, count in matched.items():
+                missing = len(self._recipe_ingredients[recipe_id]) - count
+                if max_missing is None or missing <= max_missing:
+                    ranked.append((missing, -count, recipe_id))
+
+            ranked.sort()
+            if limit is not None:
+                ranked = ranked[:limit]
+
+            return [
+                (recipe_id, -neg_count, sorted(self._recipe_ingredients[recipe_id] - available))
+                for _, neg_count, recipe_id in ranked
+            ]
+
+def load_ingredient_rows(recipe_ids=None):
+    """(recipe_id, ingredient_id) rows for the given recipes (all when None)"""
+    from app.models import RecipeIngredient
+    query = db.session.query(RecipeIngredient.recipe_id, RecipeIngredient.ingredient_id)
+    if recipe_ids is not None:
+        query = query.filter(RecipeIngredient.recipe_id.in_(recipe_ids))
+    return query.yield_per(5000)
+
+def reload_recipe_ingredients(index, recipe_ids):
+    ingredient_ids = {recipe_id: [] for recipe_id in recipe_ids}
+    for recipe_id, ingredient_id in load_ingredient_rows(recipe_ids):
+        ingredient_ids[recipe_id].append(ingredient_id)
+    for recipe_id, ids in ingredient_ids.items():
+        index.set_recipe(recipe_id, ids)
+
+def init_ingredient_index(app):
+    index = IngredientIndex()
+    app.extensions['ingredient_index'] = IndexRefresher(
+        app, index,
+        load=load_ingredient_rows,
+        reload=lambda recipe_ids: reload_recipe_ingredients(index, recipe_ids),
+        interval=app.config['INGREDIENT_INDEX_TTL'],
+        name='ingredient index',
+        run_async=app.config['INDEX_REFRESH_ASYNC']
+    )
+
+def get_ingredient_index():
+    return current_app.extensions['ingredient_index'].get()
+
+def refresh_recipe_ingredients(recipe_id, ingredient_ids):
+    """Update the index after a recipe's ingredient list is written"""
+    current_app.extensions['ingredient_index'].update(
+        [recipe_id], lambda index: index.set_recipe(recipe_id, ingredient_ids))
+
+def remove_recipe_ingredients(recipe_id):
+    current_app.extensions['ingredient_index'].update(
+        [recipe_id], lambda index: index.remove_recipe(recipe_id))
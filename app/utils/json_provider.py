@@ -0,0 +1,83 @@
+import dataclasses
+import decimal
+import uuid
+from datetime import date, datetime, timezone
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def to_json_value(o):
+    """Convert values the JSON encoders don't handle natively"""
+    if isinstance(o, datetime):
+        # Timestamps are stored as naive UTC
+        if o.tzinfo is None:
+            o = o.replace(tzinfo=timezone.utc)
+        return o.isoformat()
+
+    if isinstance(o, date):
+        return o.isoformat()
+
+    if isinstance(o, decimal.Decimal):
+        return float(o)
+
+    if isinstance(o, uuid.UUID):
+        return str(o)
+
+    if dataclasses.is_dataclass(o):
+        return dataclasses.asdict(o)
+
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """Flask's stdlib provider with ISO-8601 datetimes and numeric Decimals"""
+
+    default = staticmethod(to_json_value)
+
+class OrjsonProvider(StdlibJSONProvider):
+    """
+    Encode responses with orjson, producing the same output as
+    StdlibJSONProvider. Calls passing json.dumps keyword arguments fall
+    back to the stdlib encoder.
+    """
+
+    def _options(self, indent=False):
+        option = orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=self.default, option=self._options(indent))
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+JSON_PROVIDERS = {
+    'orjson': OrjsonProvider,
+    'stdlib': StdlibJSONProvider
+}
+
+def init_json_provider(app):
+    name = app.config['JSON_PROVIDER']
+    if name == 'orjson' and orjson is None:
+        app.logger.info("orjson is not installed; using the stdlib JSON provider")
+        name = 'stdlib'
+    app.json = JSON_PROVIDERS[name](app)
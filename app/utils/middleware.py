@@ -1,7 +1,37 @@
 from functools import wraps
-from flask import jsonify
+from flask import g, jsonify
 from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from app import db
 from app.models import User
+from app.utils.cache import get_cache, invalidate_on_write
+
+IDENTITY_TTL = 60  # seconds
+
+def identity_key(user_id):
+    return f'identity:{user_id}'
+
+# Any committed change to a user drops their cached identity
+invalidate_on_write(User, lambda user: identity_key(user.user_id))
+
+def serialize_identity(user):
+    return {
+        'user_id': user.user_id,
+        'username': user.username,
+        'email': user.email,
+        'profile_image': user.profile_image or None
+    }
+
+def load_identity(user_id):
+    """Public fields of a user from the identity cache, or None if the user does not exist"""
+    cache = get_cache()
+    identity = cache.get(identity_key(user_id))
+    if identity is None:
+        user = db.session.get(User, user_id)
+        if not user:
+            return None
+        identity = serialize_identity(user)
+        cache.set(identity_key(user_id), identity, IDENTITY_TTL)
+    return identity
 
 def token_required(f):
     @wraps(f)
@@ -9,15 +39,16 @@ def token_required(f):
         try:
             verify_jwt_in_request()
             current_user_id = get_jwt_identity()
-            current_user = User.query.get(current_user_id)
-            
-            if not current_user:
-                return jsonify({'error': 'User not found'}), 401
-                
-            return f(*args, **kwargs)
         except Exception as e:
             return jsonify({'error': 'Invalid or expired token'}), 401
             
+        current_user = load_identity(current_user_id)
+        if not current_user:
+            return jsonify({'error': 'User not found'}), 401
+            
+        g.current_user = current_user
+        return f(*args, **kwargs)
+            
     return decorated
 
 def owner_required(model):
@@ -32,15 +63,19 @@ def owner_required(model):
             if not object_id:
                 return jsonify({'error': 'Invalid request'}), 400
                 
-            # Get the object
-            obj = model.query.get(object_id)
-            if not obj:
+            if not hasattr(model, 'user_id'):
+                return jsonify({'error': 'Unauthorized access'}), 403
+                
+            # Fetch only the owner column rather than the whole object
+            primary_key = model.__mapper__.primary_key[0]
+            owner = db.session.query(model.user_id).filter(primary_key == object_id).first()
+            if not owner:
                 return jsonify({'error': f'{model.__name__} not found'}), 404
                 
             # Check ownership
-            if not hasattr(obj, 'user_id') or obj.user_id != current_user_id:
+            if owner.user_id != current_user_id:
                 return jsonify({'error': 'Unauthorized access'}), 403
                 
             return f(*args, **kwargs)
         return decorated_function
-    return decorator 
\ No newline at end of file
+    return decorator
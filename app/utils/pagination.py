@@ -0,0 +1,135 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_, tuple_
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+def encode_cursor(created_at, row_id):
+    """Encode a (created_at, id) position as an opaque URL-safe cursor"""
+    payload = json.dumps([created_at.isoformat() if created_at else None, row_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor, raising ValueError if malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(row_id, int):
+            raise ValueError
+        return datetime.fromisoformat(created_at), row_id
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def encode_rank_cursor(score, row_id):
+    """Encode a (score, id) position in a ranking as an opaque URL-safe cursor"""
+    payload = json.dumps([score, row_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_rank_cursor(cursor):
+    """Decode a cursor produced by encode_rank_cursor, raising ValueError if malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        score, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(score, (int, float)) or not isinstance(row_id, int):
+            raise ValueError
+        return score, row_id
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def encode_rating_cursor(average, count, row_id):
+    """Encode an (average rating, rating count, id) position as an opaque URL-safe cursor"""
+    payload = json.dumps([average, count, row_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_rating_cursor(cursor):
+    """Decode a cursor produced by encode_rating_cursor, raising ValueError if malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        average, count, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(average, (int, float)) or not isinstance(count, int) or not isinstance(row_id, int):
+            raise ValueError
+        return average, count, row_id
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def parse_page_args(args, decode=decode_cursor):
+    """Read 'limit' and 'after' from request args, returning (limit, after_position)"""
+    errors = []
+    limit = args.get('limit', DEFAULT_PAGE_SIZE)
+    try:
+        limit = int(limit)
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError
+    except (TypeError, ValueError):
+        errors.append(f"Limit must be an integer between 1 and {MAX_PAGE_SIZE}")
+        limit = None
+
+    after = None
+    if args.get('after'):
+        try:
+            after = decode(args['after'])
+        except ValueError as e:
+            errors.append(str(e))
+
+    return limit, after, errors
+
+def paginate_keyset(query, created_col, id_col, limit, after=None, key=None, descending=True):
+    """
+    Apply keyset pagination ordered on (created_col, id_col).
+
+    Fetches one row beyond the page size to know whether a next page exists,
+    so no COUNT query is needed. `key` maps a result row to its
+    (created_at, id) position. Returns (rows, next_cursor).
+    """
+    position = tuple_(created_col, id_col)
+    if after:
+        query = query.filter(position < tuple_(*after) if descending else position > tuple_(*after))
+
+    if descending:
+        query = query.order_by(created_col.desc(), id_col.desc())
+    else:
+        query = query.order_by(created_col.asc(), id_col.asc())
+
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(*key(rows[-1]))
+
+    return rows, next_cursor
+
+def keyset_after(order, position):
+    """
+    Condition selecting rows after `position` in `order`, a list of
+    (column, descending) pairs. Expanded into ORs rather than a row-value
+    comparison so the columns may sort in different directions.
+    """
+    (column, descending), value = order[0], position[0]
+    after = column < value if descending else column > value
+    if len(order) == 1:
+        return after
+    return or_(after, and_(column == value, keyset_after(order[1:], position[1:])))
+
+def apply_order(query, order):
+    """Order a query by `order`, a list of (column, descending) pairs"""
+    return query.order_by(*(column.desc() if descending else column.asc() for column, descending in order))
+
+def paginate_ordered(query, order, limit, after, key, encode):
+    """
+    Keyset pagination over `order`, a list of (column, descending) pairs
+    ending in a unique column. `key` maps a result row to its position and
+    `encode` turns that position into a cursor. Returns (rows, next_cursor).
+    """
+    if after:
+        query = query.filter(keyset_after(order, after))
+    query = apply_order(query, order)
+
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode(*key(rows[-1]))
+
+    return rows, next_cursor
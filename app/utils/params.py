@@ -0,0 +1,17 @@
+def parse_id_list(values, label):
+    """
+    Parse integer IDs given as comma-separated and/or repeated query values,
+    returning (ids, errors) with duplicates removed and order preserved.
+    """
+    ids = {}
+    errors = []
+    for value in values:
+        for part in value.split(','):
+            part = part.strip()
+            if not part:
+                continue
+            if not part.isdigit():
+                errors.append(f"{label} '{part}' must be an integer")
+            else:
+                ids[int(part)] = None
+    return list(ids), errors
@@ -0,0 +1,46 @@
+import os
+import threading
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+class PasswordHasher:
+    """
+    Password hashing with a configurable werkzeug method (for example
+    'scrypt:32768:8:1' or 'pbkdf2:sha256:600000').
+
+    Hashes run on the calling request thread. hashlib releases the GIL
+    while deriving keys, so concurrent requests already hash in parallel,
+    and moving the work to another thread would not free the worker while
+    it waits. What the semaphore adds is a cap on concurrent hashes: a
+    login burst queues for a slot instead of running more memory-hard
+    scrypt derivations at once than there are cores.
+    """
+
+    def __init__(self, method='scrypt', salt_length=16, max_concurrency=None):
+        self.salt_length = salt_length
+        # Normalize shorthand like 'scrypt' to the full parameter string
+        # werkzeug stores, so stored hashes can be compared against it
+        self.method = generate_password_hash('', method, salt_length).split('$', 1)[0]
+        self._slots = threading.BoundedSemaphore(max_concurrency or os.cpu_count() or 1)
+
+    def _run(self, fn, *args):
+        with self._slots:
+            return fn(*args)
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method, self.salt_length)
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        return password_hash.split('$', 1)[0] != self.method
+
+def init_password_hasher(app):
+    app.extensions['password_hasher'] = PasswordHasher(
+        method=app.config['PASSWORD_HASH_METHOD'],
+        max_concurrency=app.config['PASSWORD_HASH_CONCURRENCY']
+    )
+
+def get_password_hasher():
+    return current_app.extensions['password_hasher']
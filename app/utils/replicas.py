@@ -0,0 +1,158 @@
+import itertools
+import threading
+import time
+from flask import g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, exc as sa_exc, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql.dml import UpdateBase
+from app.utils.cache import get_cache
+from app.utils.db_pool import build_engine_options
+
+# Blueprints whose GET endpoints never write
+READ_ONLY_BLUEPRINTS = {'recipes', 'categories', 'ingredients', 'comments', 'ratings',
+                        'favorites', 'dietary_restrictions'}
+SAFE_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+def replica_bind_keys(urls, config):
+    """
+    SQLALCHEMY_BINDS entries for the replica URLs. Flask-SQLAlchemy doesn't
+    apply SQLALCHEMY_ENGINE_OPTIONS to binds, so each entry carries the same
+    DB_* pool options as the primary. PostgreSQL replicas also get a short
+    connect timeout so an unreachable host fails fast instead of holding a
+    request until the TCP timeout.
+    """
+    binds = {}
+    for i, url in enumerate(urls):
+        options = build_engine_options(config, url)
+        options['url'] = url
+        if config['REPLICA_CONNECT_TIMEOUT'] and make_url(url).drivername.startswith('postgresql'):
+            options['connect_args'] = {'connect_timeout': config['REPLICA_CONNECT_TIMEOUT']}
+        binds[f'replica_{i}'] = options
+    return binds
+
+class ReplicaRouter:
+    """
+    Round-robin over replica binds, skipping ones marked unhealthy.
+
+    A background thread, started by the first choice, probes every replica
+    with SELECT 1 each `check_interval` seconds, so requests never wait on
+    a probe. Replicas are used once a probe succeeds; failed probes and
+    disconnects seen on a replica's engine take it out of rotation until
+    the next successful probe.
+    """
+
+    def __init__(self, app, engines, check_interval=30):
+        self.app = app
+        self.engines = dict(engines)
+        self.bind_keys = list(self.engines)
+        self.check_interval = check_interval
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._healthy = {}
+        self._thread = None
+
+    def choose(self):
+        """A healthy replica bind key, or None to use the primary"""
+        self._ensure_thread()
+        start = next(self._counter)
+        for i in range(len(self.bind_keys)):
+            bind_key = self.bind_keys[(start + i) % len(self.bind_keys)]
+            if self._healthy.get(bind_key):
+                return bind_key
+        return None
+
+    def probe(self, bind_key):
+        engine = self.engines[bind_key]
+        try:
+            with engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+            return True
+        except sa_exc.DBAPIError:
+            self.app.logger.warning("Read replica %s is unavailable", engine.url.host or engine.url.database)
+            return False
+
+    def probe_all(self):
+        for bind_key in self.bind_keys:
+            healthy = self.probe(bind_key)
+            with self._lock:
+                self._healthy[bind_key] = healthy
+
+    def mark_unhealthy(self, bind_key):
+        with self._lock:
+            self._healthy[bind_key] = False
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='replica-health', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.probe_all()
+            except Exception:
+                self.app.logger.exception("Replica health check failed")
+            time.sleep(self.check_interval)
+
+class RoutingSession(Session):
+    """
+    Session sending reads to the replica chosen for the current request
+    (g.replica_bind) and everything else to the primary. Once a request
+    flushes or executes DML, its remaining reads use the primary too.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            if self._flushing or isinstance(clause, UpdateBase):
+                g.replica_bind = None
+            elif g.get('replica_bind'):
+                return self._db.engines[g.replica_bind]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def sticky_key(user_id):
+    return f"primary-sticky:{user_id}"
+
+def current_identity():
+    try:
+        verify_jwt_in_request(optional=True)
+        return get_jwt_identity()
+    except Exception:
+        return None
+
+def init_replicas(app, db):
+    bind_keys = [key for key in app.config.get('SQLALCHEMY_BINDS', {}) if key.startswith('replica_')]
+    if not bind_keys:
+        return
+
+    with app.app_context():
+        engines = {bind_key: db.engines[bind_key] for bind_key in bind_keys}
+    router = ReplicaRouter(app, engines, check_interval=app.config['REPLICA_HEALTH_CHECK_INTERVAL'])
+    app.extensions['replica_router'] = router
+
+    for bind_key, engine in engines.items():
+        @event.listens_for(engine, 'handle_error')
+        def _on_error(context, bind_key=bind_key):
+            if context.is_disconnect:
+                router.mark_unhealthy(bind_key)
+
+    @app.before_request
+    def route_reads_to_replica():
+        if request.method not in SAFE_METHODS or request.blueprint not in READ_ONLY_BLUEPRINTS:
+            return
+        # Users who just wrote read from the primary until replicas catch up
+        user_id = current_identity()
+        if user_id is not None and get_cache().get(sticky_key(user_id)):
+            return
+        g.replica_bind = router.choose()
+
+    @app.after_request
+    def stick_writers_to_primary(response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            user_id = current_identity()
+            if user_id is not None:
+                get_cache().set(sticky_key(user_id), True, ttl=app.config['REPLICA_STICKY_SECONDS'])
+        return response
@@ -0,0 +1,198 @@
+import re
+import threading
+import time
+from bisect import bisect_left
+from flask import current_app
+from sqlalchemy import case, func, literal_column
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from app import db
+from app.utils.index_refresher import IndexRefresher
+
+SEARCH_CONFIG = 'english'
+TOKEN_RE = re.compile(r'\w+')
+
+# Per-field weights, mirroring PostgreSQL's default ts_rank weights for A/B/C
+FIELD_WEIGHTS = (
+    ('title', 1.0),
+    ('description', 0.4),
+    ('instructions', 0.2),
+)
+
+# Generated column kept in sync by PostgreSQL itself on every insert/update
+search_vector = literal_column('recipes.search_vector', type_=TSVECTOR)
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+def build_tsquery(search):
+    """Turn free text into an AND tsquery, treating the last word as a prefix"""
+    terms = tokenize(search)
+    if not terms:
+        return None
+    return ' & '.join(terms[:-1] + [terms[-1] + ':*'])
+
+def use_fulltext():
+    return db.engine.dialect.name == 'postgresql'
+
+class InvertedIndex:
+    """
+    In-process inverted index over recipe text, used when the database has
+    no full-text search support (SQLite in development and tests).
+
+    Postings map each term to {recipe_id: weight}; queries AND their terms
+    and treat the last one as a prefix, matching build_tsquery. Built on
+    first use and rebuilt periodically by an IndexRefresher, so recipes
+    written by other processes show up.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = {}
+        self._doc_terms = {}
+        self._vocab = None
+        self.built_at = None
+
+    @property
+    def built(self):
+        return self.built_at is not None
+
+    def build(self, rows):
+        """Build from recipe rows, then swap the result in"""
+        index = InvertedIndex()
+        for row in rows:
+            index._add(row)
+        with self._lock:
+            self._postings = index._postings
+            self._doc_terms = index._doc_terms
+            self._vocab = None
+            self.built_at = time.monotonic()
+
+    def add(self, recipe):
+        with self._lock:
+            self._remove(recipe.recipe_id)
+            self._add(recipe)
+
+    def remove(self, recipe_id):
+        with self._lock:
+            self._remove(recipe_id)
+
+    def _add(self, recipe):
+        weights = {}
+        for field, weight in FIELD_WEIGHTS:
+            for term in tokenize(getattr(recipe, field)):
+                weights[term] = weights.get(term, 0) + weight
+
+        for term, weight in weights.items():
+            if term not in self._postings:
+                self._postings[term] = {}
+                self._vocab = None
+            self._postings[term][recipe.recipe_id] = weight
+        self._doc_terms[recipe.recipe_id] = set(weights)
+
+    def _remove(self, recipe_id):
+        for term in self._doc_terms.pop(recipe_id, ()):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(recipe_id, None)
+            if not postings:
+                del self._postings[term]
+                self._vocab = None
+
+    def _prefix_postings(self, prefix):
+        if self._vocab is None:
+            self._vocab = sorted(self._postings)
+        merged = {}
+        i = bisect_left(self._vocab, prefix)
+        while i < len(self._vocab) and self._vocab[i].startswith(prefix):
+            for recipe_id, weight in self._postings[self._vocab[i]].items():
+                merged[recipe_id] = max(merged.get(recipe_id, 0), weight)
+            i += 1
+        return merged
+
+    def search(self, text):
+        """Return matching recipe ids, best match first"""
+        terms = tokenize(text)
+        if not terms:
+            return []
+
+        with self._lock:
+            term_postings = [self._postings.get(t, {}) for t in terms[:-1]]
+            term_postings.append(self._prefix_postings(terms[-1]))
+
+        # Intersect starting from the rarest term
+        term_postings.sort(key=len)
+        scores = dict(term_postings[0])
+        for postings in term_postings[1:]:
+            scores = {rid: s + postings[rid] for rid, s in scores.items() if rid in postings}
+            if not scores:
+                break
+
+        return sorted(scores, key=lambda rid: (-scores[rid], rid))
+
+def load_search_rows(recipe_ids=None):
+    """Searchable text of the given recipes (all when None)"""
+    from app.models import Recipe
+    query = db.session.query(Recipe.recipe_id, Recipe.title, Recipe.description, Recipe.instructions)
+    if recipe_ids is not None:
+        query = query.filter(Recipe.recipe_id.in_(recipe_ids))
+    return query.yield_per(1000)
+
+def reload_search_rows(index, recipe_ids):
+    missing = set(recipe_ids)
+    for row in load_search_rows(recipe_ids):
+        index.add(row)
+        missing.discard(row.recipe_id)
+    for recipe_id in missing:
+        index.remove(recipe_id)
+
+def init_search_index(app):
+    index = InvertedIndex()
+    app.extensions['search_index'] = IndexRefresher(
+        app, index,
+        load=load_search_rows,
+        reload=lambda recipe_ids: reload_search_rows(index, recipe_ids),
+        interval=app.config['SEARCH_INDEX_TTL'],
+        name='search index',
+        run_async=app.config['INDEX_REFRESH_ASYNC']
+    )
+
+def apply_search(query, search, ranked=True):
+    """
+    Restrict a Recipe query to full-text matches for `search`.
+
+    On PostgreSQL this uses the GIN-indexed search_vector column and orders
+    by ts_rank; elsewhere it falls back to the in-process inverted index.
+    Pass ranked=False when the caller imposes its own ordering.
+    """
+    from app.models import Recipe
+
+    if use_fulltext():
+        tsquery_text = build_tsquery(search)
+        if tsquery_text is None:
+            return query
+        tsquery = func.to_tsquery(SEARCH_CONFIG, tsquery_text)
+        query = query.filter(search_vector.op('@@')(tsquery))
+        if ranked:
+            query = query.order_by(func.ts_rank(search_vector, tsquery).desc(), Recipe.recipe_id)
+        return query
+
+    recipe_ids = current_app.extensions['search_index'].get().search(search)
+    if not recipe_ids:
+        return query.filter(db.false()) if tokenize(search) else query
+
+    query = query.filter(Recipe.recipe_id.in_(recipe_ids))
+    if ranked:
+        positions = {rid: pos for pos, rid in enumerate(recipe_ids)}
+        query = query.order_by(case(positions, value=Recipe.recipe_id))
+    return query
+
+def index_recipe(recipe):
+    """Refresh the fallback index after a recipe is created or updated"""
+    if not use_fulltext():
+        current_app.extensions['search_index'].update([recipe.recipe_id], lambda index: index.add(recipe))
+
+def unindex_recipe(recipe_id):
+    """Drop a deleted recipe from the fallback index"""
+    if not use_fulltext():
+        current_app.extensions['search_index'].update([recipe_id], lambda index: index.remove(recipe_id))
@@ -0,0 +1,8 @@
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+
+def dialect_insert(model):
+    """INSERT construct supporting ON CONFLICT clauses on the bound database"""
+    if db.engine.dialect.name == 'postgresql':
+        return postgresql.insert(model)
+    return sqlite.insert(model)
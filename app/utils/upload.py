@@ -1,14 +1,44 @@
+import hashlib
 import os
-import uuid
+import shutil
+import tempfile
+import threading
 from PIL import Image
 from io import BytesIO
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError
+from flask import current_app, Request
 from werkzeug.utils import secure_filename
 import magic
 
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+ALLOWED_FORMATS = {'PNG', 'JPEG', 'GIF'}
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
+MAX_IMAGE_PIXELS = 40 * 1000 * 1000  # Rejects decompression bombs before decoding
+MAX_FORM_OVERHEAD = 64 * 1024  # Allowance for other form fields and multipart framing
+
+class UploadRequest(Request):
+    """Request that spools uploaded files to disk past a small in-memory threshold"""
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(
+            max_size=current_app.config['UPLOAD_SPOOL_THRESHOLD'], mode='rb+'
+        )
+
+def upload_too_large(request):
+    """Reject an image upload from its Content-Length before the body is read"""
+    return request.content_length is not None and \
+        request.content_length > MAX_FILE_SIZE + MAX_FORM_OVERHEAD
+
+# libmagic handles are expensive to open and not safe to share across threads
+_magic = threading.local()
+
+def detect_mime_type(buffer):
+    if not hasattr(_magic, 'mime'):
+        _magic.mime = magic.Magic(mime=True)
+    return _magic.mime.from_buffer(buffer)
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -32,105 +62,229 @@ def validate_image(file):
     if not allowed_file(file.filename):
         errors.append("File type not allowed. Allowed types: " + ", ".join(ALLOWED_EXTENSIONS))
         
+    if errors:
+        return errors
+        
     # Verify file content type
     file_content = file.read(2048)
     file.seek(0)
-    mime = magic.Magic(mime=True)
-    content_type = mime.from_buffer(file_content)
+    content_type = detect_mime_type(file_content)
     
     if not content_type.startswith('image/'):
         errors.append("File must be an image")
+        return errors
         
-    return errors
-
-def optimize_image(file):
-    """Optimize image for storage"""
+    # Parse only the image header to check format and dimensions
     try:
-        image = Image.open(file)
+        with Image.open(file) as image:
+            if image.format not in ALLOWED_FORMATS:
+                errors.append("Image format not supported")
+            elif image.size[0] * image.size[1] > MAX_IMAGE_PIXELS:
+                errors.append("Image dimensions are too large")
+    except Exception:
+        errors.append("File is not a valid image")
+    finally:
+        file.seek(0)
         
-        # Convert to RGB if necessary
-        if image.mode not in ('RGB', 'RGBA'):
+    return errors
+
+# Longest edge of each stored profile image variant; the first is the primary
+PROFILE_IMAGE_SIZES = (800, 200)
+
+def open_image(file, max_size):
+    """Open an image, letting the JPEG decoder downscale while it decodes"""
+    image = Image.open(file)
+    image.draft('RGB', (max_size, max_size))
+    
+    # Convert to RGB if necessary
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGB')
+    return image
+
+def encode_image(image, format):
+    output = BytesIO()
+    if format == 'JPEG':
+        # JPEG has no alpha channel
+        if image.mode == 'RGBA':
             image = image.convert('RGB')
-            
-        # Resize if too large while maintaining aspect ratio
-        max_size = (800, 800)
-        if image.size[0] > max_size[0] or image.size[1] > max_size[1]:
-            image.thumbnail(max_size, Image.Resampling.LANCZOS)
-            
-        # Save optimized image
-        output = BytesIO()
         image.save(output, format='JPEG', quality=85, optimize=True)
-        output.seek(0)
-        
-        return output
+    else:
+        image.save(output, format=format, quality=80, method=4)
+    output.seek(0)
+    return output
+
+def render_variants(file, sizes=PROFILE_IMAGE_SIZES):
+    """
+    Yield (suffix, extension, content_type, data) for a JPEG and a WebP
+    rendition at each size, largest first. Each smaller size is resized from
+    the previous one rather than from the original.
+    """
+    try:
+        image = open_image(file, max(sizes))
+        for i, size in enumerate(sorted(sizes, reverse=True)):
+            if image.size[0] > size or image.size[1] > size:
+                image = image.copy()
+                image.thumbnail((size, size), Image.Resampling.LANCZOS)
+            suffix = '' if i == 0 else f'_{size}'
+            yield suffix, 'jpg', 'image/jpeg', encode_image(image, 'JPEG')
+            yield suffix, 'webp', 'image/webp', encode_image(image, 'WEBP')
     except Exception as e:
         raise ValueError(f"Error processing image: {str(e)}")
 
-class S3Uploader:
-    def __init__(self):
+# Stored names are derived from content, so stored objects never change
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+def content_hash(file):
+    """Hash a file-like object in chunks, leaving it rewound"""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: file.read(64 * 1024), b''):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()[:32]
+
+class BaseUploader:
+    def store(self, data, filename, content_type):
+        """Persist a file-like object under `filename` and return its public URL"""
+        raise NotImplementedError
+        
+    def exists(self, filename):
+        raise NotImplementedError
+        
+    def url_for(self, filename):
+        raise NotImplementedError
+        
+    def upload_variants(self, file, folder='profile-images'):
+        """Store every size/format variant of an image, returning the primary JPEG URL"""
+        try:
+            # Variants are named after the original's hash, so a re-upload of
+            # the same image is recognized without decoding it again
+            base = f"{folder}/{content_hash(file)}"
+            primary = f"{base}.jpg"
+            if self.exists(primary):
+                return self.url_for(primary)
+                
+            variants = [(f"{base}{suffix}.{ext}", content_type, data)
+                        for suffix, ext, content_type, data in render_variants(file)]
+            
+            # Store the primary last: its presence means the whole set is complete
+            for filename, content_type, data in reversed(variants):
+                url = self.store(data, filename, content_type)
+            return url
+            
+        except ValueError:
+            raise
+        except Exception as e:
+            raise ValueError(f"Error processing upload: {str(e)}")
+
+class S3Uploader(BaseUploader):
+    """
+    Uploads to S3 or an S3-compatible server. One instance is shared by the
+    whole process: boto3 clients are thread-safe and keep a pool of
+    keep-alive connections, and large objects go up as parallel multipart
+    uploads.
+    """
+    
+    def __init__(self, bucket=None, endpoint_url=None, max_pool_connections=20,
+                 multipart_threshold=8 * 1024 * 1024, max_concurrency=4):
         self.s3_client = boto3.client(
             's3',
             aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
             aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-            region_name=os.getenv('AWS_REGION', 'us-east-1')
+            region_name=os.getenv('AWS_REGION', 'us-east-1'),
+            endpoint_url=endpoint_url,
+            config=Config(
+                max_pool_connections=max_pool_connections,
+                tcp_keepalive=True,
+                retries={'max_attempts': 3, 'mode': 'standard'}
+            )
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_threshold,
+            max_concurrency=max_concurrency
         )
-        self.bucket = os.getenv('AWS_S3_BUCKET')
+        self.bucket = bucket or os.getenv('AWS_S3_BUCKET')
+        self.endpoint_url = endpoint_url
         
-    def upload_file(self, file, folder='profile-images'):
+    def url_for(self, filename):
+        if self.endpoint_url:
+            return f"{self.endpoint_url.rstrip('/')}/{self.bucket}/{filename}"
+        return f"https://{self.bucket}.s3.amazonaws.com/{filename}"
+        
+    def exists(self, filename):
+        try:
+            self.s3_client.head_object(Bucket=self.bucket, Key=filename)
+            return True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise ValueError(f"Error checking S3 object: {str(e)}")
+        
+    def store(self, data, filename, content_type):
         try:
-            # Generate unique filename
-            ext = file.filename.rsplit('.', 1)[1].lower()
-            filename = f"{folder}/{str(uuid.uuid4())}.{ext}"
-            
-            # Optimize image
-            optimized_file = optimize_image(file)
-            
             # Upload to S3
             self.s3_client.upload_fileobj(
-                optimized_file,
+                data,
                 self.bucket,
                 filename,
                 ExtraArgs={
-                    'ContentType': 'image/jpeg',
+                    'ContentType': content_type,
+                    'CacheControl': IMMUTABLE_CACHE_CONTROL,
                     'ACL': 'public-read'
-                }
+                },
+                Config=self.transfer_config
             )
             
             # Return public URL
-            return f"https://{self.bucket}.s3.amazonaws.com/{filename}"
+            return self.url_for(filename)
             
         except ClientError as e:
             raise ValueError(f"Error uploading to S3: {str(e)}")
-        except Exception as e:
-            raise ValueError(f"Error processing upload: {str(e)}")
 
-class LocalUploader:
-    def __init__(self):
-        self.upload_folder = os.path.join(os.getcwd(), 'uploads', 'profile-images')
-        os.makedirs(self.upload_folder, exist_ok=True)
+class LocalUploader(BaseUploader):
+    def __init__(self, upload_folder=None):
+        self.upload_folder = upload_folder or os.path.join(os.getcwd(), 'uploads')
+        os.makedirs(os.path.join(self.upload_folder, 'profile-images'), exist_ok=True)
         
-    def upload_file(self, file):
-        try:
-            # Generate unique filename
-            ext = file.filename.rsplit('.', 1)[1].lower()
-            filename = f"{str(uuid.uuid4())}.{ext}"
-            filepath = os.path.join(self.upload_folder, filename)
-            
-            # Optimize image
-            optimized_file = optimize_image(file)
-            
-            # Save to local storage
-            with open(filepath, 'wb') as f:
-                f.write(optimized_file.getvalue())
-            
-            # Return local URL
-            return f"/uploads/profile-images/{filename}"
-            
-        except Exception as e:
-            raise ValueError(f"Error processing upload: {str(e)}")
+    def url_for(self, filename):
+        return f"/uploads/{filename}"
+        
+    def exists(self, filename):
+        return os.path.exists(os.path.join(self.upload_folder, filename))
+        
+    def store(self, data, filename, content_type):
+        filepath = os.path.join(self.upload_folder, filename)
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        
+        # Save to local storage, writing the buffer without copying it. Write
+        # to a temporary name first so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(filepath))
+        with os.fdopen(fd, 'wb') as f:
+            if isinstance(data, BytesIO):
+                f.write(data.getbuffer())
+            else:
+                shutil.copyfileobj(data, f)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, filepath)
+        
+        # Return local URL
+        return self.url_for(filename)
+
+STORAGE_BACKENDS = {
+    's3': lambda app: S3Uploader(
+        bucket=app.config['AWS_S3_BUCKET'],
+        endpoint_url=app.config['AWS_S3_ENDPOINT_URL'],
+        max_pool_connections=app.config['S3_MAX_POOL_CONNECTIONS'],
+        multipart_threshold=app.config['S3_MULTIPART_THRESHOLD'],
+        max_concurrency=app.config['S3_MAX_CONCURRENCY']
+    ),
+    'local': lambda app: LocalUploader(app.config['UPLOAD_FOLDER']),
+}
+
+def init_storage(app):
+    """Create the configured storage backend once for the lifetime of the app"""
+    app.extensions['storage'] = STORAGE_BACKENDS[app.config['STORAGE_BACKEND']](app)
 
 # Choose uploader based on configuration
 def get_uploader():
-    if os.getenv('USE_S3', 'false').lower() == 'true':
-        return S3Uploader()
-    return LocalUploader() 
\ No newline at end of file
+    return current_app.extensions['storage']
@@ -27,12 +27,26 @@ CREATE TABLE Recipes (
     prep_time INT,
     cook_time INT,
     servings INT,
+    rating_sum INT NOT NULL DEFAULT 0,
+    rating_count INT NOT NULL DEFAULT 0,
+    comment_count INT NOT NULL DEFAULT 0,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    search_vector TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(instructions, '')), 'C')
+    ) STORED,
     CONSTRAINT fk_user FOREIGN KEY (user_id) REFERENCES Users (user_id) ON DELETE CASCADE,
     CONSTRAINT fk_category FOREIGN KEY (category_id) REFERENCES Categories (category_id) ON DELETE SET NULL
 );
 
+-- Full-text search index for recipe search
+CREATE INDEX ix_recipes_search_vector ON Recipes USING GIN (search_vector);
+
+CREATE INDEX ix_recipes_user_id ON Recipes (user_id);
+CREATE INDEX ix_recipes_category_id ON Recipes (category_id);
+
 -- Create Ingredients Table
 CREATE TABLE Ingredients (
     ingredient_id SERIAL PRIMARY KEY,
@@ -50,6 +64,9 @@ CREATE TABLE Recipe_Ingredients (
     CONSTRAINT fk_ingredient FOREIGN KEY (ingredient_id) REFERENCES Ingredients (ingredient_id) ON DELETE CASCADE
 );
 
+CREATE INDEX ix_recipe_ingredients_recipe_id ON Recipe_Ingredients (recipe_id);
+CREATE INDEX ix_recipe_ingredients_ingredient_recipe ON Recipe_Ingredients (ingredient_id, recipe_id);
+
 -- Create Ratings Table
 CREATE TABLE Ratings (
     rating_id SERIAL PRIMARY KEY,
@@ -58,9 +75,12 @@ CREATE TABLE Ratings (
     rating INT CHECK (rating BETWEEN 1 AND 5),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     CONSTRAINT fk_user_rating FOREIGN KEY (user_id) REFERENCES Users (user_id) ON DELETE CASCADE,
-    CONSTRAINT fk_recipe_rating FOREIGN KEY (recipe_id) REFERENCES Recipes (recipe_id) ON DELETE CASCADE
+    CONSTRAINT fk_recipe_rating FOREIGN KEY (recipe_id) REFERENCES Recipes (recipe_id) ON DELETE CASCADE,
+    CONSTRAINT uq_ratings_user_recipe UNIQUE (user_id, recipe_id)
 );
 
+CREATE INDEX ix_ratings_recipe_id ON Ratings (recipe_id);
+
 -- Create Comments Table
 CREATE TABLE Comments (
     comment_id SERIAL PRIMARY KEY,
@@ -72,6 +92,9 @@ CREATE TABLE Comments (
     CONSTRAINT fk_recipe_comment FOREIGN KEY (recipe_id) REFERENCES Recipes (recipe_id) ON DELETE CASCADE
 );
 
+-- Backs keyset pagination of a recipe's comments
+CREATE INDEX ix_comments_recipe_created ON Comments (recipe_id, created_at, comment_id);
+
 -- Create Favorites Table
 CREATE TABLE Favorites (
     favorite_id SERIAL PRIMARY KEY,
@@ -79,9 +102,12 @@ CREATE TABLE Favorites (
     recipe_id INT NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     CONSTRAINT fk_user_favorite FOREIGN KEY (user_id) REFERENCES Users (user_id) ON DELETE CASCADE,
-    CONSTRAINT fk_recipe_favorite FOREIGN KEY (recipe_id) REFERENCES Recipes (recipe_id) ON DELETE CASCADE
+    CONSTRAINT fk_recipe_favorite FOREIGN KEY (recipe_id) REFERENCES Recipes (recipe_id) ON DELETE CASCADE,
+    CONSTRAINT uq_favorites_user_recipe UNIQUE (user_id, recipe_id)
 );
 
+CREATE INDEX ix_favorites_user_created ON Favorites (user_id, created_at, favorite_id);
+
 -- Create Dietary_Restrictions Table
 CREATE TABLE Dietary_Restrictions (
     dietary_restriction_id SERIAL PRIMARY KEY,
@@ -97,6 +123,9 @@ CREATE TABLE Recipe_Dietary_Restrictions (
     CONSTRAINT fk_dietary FOREIGN KEY (dietary_restriction_id) REFERENCES Dietary_Restrictions (dietary_restriction_id) ON DELETE CASCADE
 );
 
+CREATE INDEX ix_recipe_dietary_restrictions_restriction_recipe ON Recipe_Dietary_Restrictions (dietary_restriction_id, recipe_id);
+CREATE INDEX ix_recipe_dietary_restrictions_recipe_id ON Recipe_Dietary_Restrictions (recipe_id);
+
 -- Insert Initial Data for Categories (Optional)
 INSERT INTO Categories (name)
 VALUES 
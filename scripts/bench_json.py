@@ -0,0 +1,62 @@
+"""
+Compare the JSON providers on recipe listing payloads.
+
+Builds a paginated listing like GET /api/recipes/?limit=N (summaries with
+datetimes and Decimal quantities) and times each provider's response()
+on it. Run from the repository root:
+
+    python -m scripts.bench_json --rows 5000 --repeat 20
+"""
+import argparse
+import timeit
+from datetime import datetime, timedelta
+from decimal import Decimal
+from flask import Flask
+from app.utils.json_provider import JSON_PROVIDERS, orjson
+
+def build_listing(rows):
+    created = datetime(2024, 1, 1, 12, 0, 0)
+    return {
+        'recipes': [{
+            'recipe_id': i,
+            'title': f'Recipe {i}',
+            'description': 'A hearty dish with a long enough description to be realistic. ' * 2,
+            'image_url': f'/uploads/profile-images/{i:032x}.jpg',
+            'author': f'user_{i % 500}',
+            'average_rating': round((i % 50) / 10, 1),
+            'ratings_count': i % 200,
+            'ingredients': [{
+                'ingredient_id': j,
+                'quantity': Decimal('1.25') * (j + 1),
+                'unit': 'g'
+            } for j in range(8)],
+            'created_at': created + timedelta(minutes=i),
+            'updated_at': created + timedelta(minutes=i, seconds=30)
+        } for i in range(rows)],
+        'next_cursor': 'WyIyMDI0LTAxLTAxVDEyOjAwOjAwIiwgMV0'
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rows', type=int, default=5000, help='Recipes in the listing')
+    parser.add_argument('--repeat', type=int, default=20, help='Encodings timed per provider')
+    args = parser.parse_args()
+    
+    payload = build_listing(args.rows)
+    app = Flask(__name__)
+    
+    bodies = {}
+    for name, provider_class in JSON_PROVIDERS.items():
+        if name == 'orjson' and orjson is None:
+            print(f"{name:>8}: not installed")
+            continue
+        provider = provider_class(app)
+        bodies[name] = provider.response(payload).get_data()
+        seconds = min(timeit.repeat(lambda: provider.response(payload), number=1, repeat=args.repeat))
+        print(f"{name:>8}: {seconds * 1000:8.2f} ms per response, {len(bodies[name]) / 1024:.0f} KiB")
+    
+    if len(bodies) == 2:
+        print("identical output" if bodies['orjson'] == bodies['stdlib'] else "OUTPUT DIFFERS")
+
+if __name__ == '__main__':
+    main()
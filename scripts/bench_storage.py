@@ -0,0 +1,79 @@
+"""
+Compare a new S3 client per upload with the shared client.
+
+Uploads objects to the S3-compatible server at AWS_S3_ENDPOINT_URL the way
+upload_variants does (a HEAD for the primary, then a PUT per object), from
+several threads at once like concurrent requests. The 'per-upload' mode
+builds a fresh S3Uploader for every upload, as get_uploader used to; the
+'shared' mode reuses the one instance init_storage creates. Run from the
+repository root against a scratch bucket, for example a local MinIO:
+
+    AWS_S3_ENDPOINT_URL=http://localhost:9000 AWS_ACCESS_KEY_ID=... \\
+    AWS_SECRET_ACCESS_KEY=... python -m scripts.bench_storage --uploads 200
+"""
+import argparse
+import os
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from botocore.exceptions import ClientError
+from app.utils.upload import S3Uploader
+
+def make_uploader(args):
+    return S3Uploader(bucket=args.bucket, endpoint_url=os.environ['AWS_S3_ENDPOINT_URL'],
+                      max_pool_connections=args.workers)
+
+def ensure_bucket(uploader):
+    try:
+        uploader.s3_client.head_bucket(Bucket=uploader.bucket)
+    except ClientError:
+        uploader.s3_client.create_bucket(Bucket=uploader.bucket)
+
+def run(mode, args, payload, shared):
+    prefix = f"bench-storage/{uuid.uuid4().hex}"
+
+    def upload(i):
+        start = time.perf_counter()
+        uploader = shared if mode == 'shared' else make_uploader(args)
+        filename = f"{prefix}/{i}.jpg"
+        if not uploader.exists(filename):
+            uploader.store(BytesIO(payload), filename, 'image/jpeg')
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        latencies = sorted(executor.map(upload, range(args.uploads)))
+    elapsed = time.perf_counter() - start
+
+    # Remove this run's objects
+    for i in range(0, args.uploads, 1000):
+        shared.s3_client.delete_objects(Bucket=shared.bucket, Delete={'Objects': [
+            {'Key': f"{prefix}/{n}.jpg"} for n in range(i, min(i + 1000, args.uploads))
+        ]})
+
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"{mode:>10}: {args.uploads / elapsed:8.1f} uploads/s, "
+          f"median {statistics.median(latencies) * 1000:7.2f} ms, p95 {p95 * 1000:7.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--uploads', type=int, default=200, help='Objects uploaded per mode')
+    parser.add_argument('--size', type=int, default=64 * 1024, help='Bytes per object')
+    parser.add_argument('--workers', type=int, default=8, help='Concurrent uploads')
+    parser.add_argument('--bucket', default=os.getenv('AWS_S3_BUCKET') or 'bench-storage',
+                        help='Bucket to upload to, created if missing')
+    args = parser.parse_args()
+
+    if not os.getenv('AWS_S3_ENDPOINT_URL'):
+        parser.error("AWS_S3_ENDPOINT_URL must point at an S3-compatible server")
+
+    payload = os.urandom(args.size)
+    shared = make_uploader(args)
+    ensure_bucket(shared)
+    for mode in ('per-upload', 'shared'):
+        run(mode, args, payload, shared)
+
+if __name__ == '__main__':
+    main()
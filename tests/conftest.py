@@ -0,0 +1,60 @@
+from contextlib import contextmanager
+import os
+import pytest
+from sqlalchemy import event
+from app import create_app, db
+
+def make_app(tmp_path, monkeypatch, database_url):
+    # Uploads go under the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('DATABASE_URL', database_url)
+    monkeypatch.setenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:1000')
+    monkeypatch.setenv('FEED_REFRESH_ASYNC', 'false')
+    monkeypatch.setenv('INDEX_REFRESH_ASYNC', 'false')
+    monkeypatch.setenv('IMAGE_PROCESSING_ASYNC', 'false')
+    
+    app = create_app()
+    app.config['TESTING'] = True
+    return app
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    app = make_app(tmp_path, monkeypatch, 'sqlite://')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def postgres_app(tmp_path, monkeypatch):
+    """App on the PostgreSQL database at TEST_POSTGRES_URL, whose tables are dropped afterwards"""
+    database_url = os.getenv('TEST_POSTGRES_URL')
+    if not database_url:
+        pytest.skip('TEST_POSTGRES_URL is not set')
+    app = make_app(tmp_path, monkeypatch, database_url)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def count_queries(app):
+    """Context manager collecting the SQL statements executed inside it"""
+    @contextmanager
+    def counter():
+        statements = []
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+    return counter
@@ -0,0 +1,95 @@
+import threading
+import time
+import pytest
+from flask_jwt_extended import create_access_token
+from app import db
+from app.models import User, Recipe, Category, Rating
+
+# Rating.upsert runs a single INSERT ... ON CONFLICT statement on PostgreSQL
+# only, so these tests need a real server (see the postgres_app fixture)
+
+def create_recipe(rater_count=2):
+    author = User(username='author', email='author@example.com', password_hash='x')
+    category = Category(name='Main')
+    raters = [User(username=f'rater{i}', email=f'rater{i}@example.com', password_hash='x')
+              for i in range(rater_count)]
+    db.session.add_all([author, category, *raters])
+    db.session.flush()
+
+    recipe = Recipe(user_id=author.user_id, category_id=category.category_id, title='Stew',
+                    description='A stew', instructions='Simmer')
+    db.session.add(recipe)
+    db.session.commit()
+    return recipe.recipe_id, [rater.user_id for rater in raters]
+
+def in_app_context(app, f, results, key):
+    def run():
+        with app.app_context():
+            try:
+                results[key] = f()
+            finally:
+                db.session.remove()
+    return threading.Thread(target=run)
+
+def test_upsert_returns_previous_rating(postgres_app):
+    recipe_id, (user_id, _) = create_recipe()
+
+    assert Rating.upsert(user_id, recipe_id, 4) is None
+    db.session.commit()
+    assert Rating.upsert(user_id, recipe_id, 2) == 4
+    db.session.commit()
+    assert Rating.upsert(user_id, recipe_id, 2) == 2
+    db.session.commit()
+
+    ratings = Rating.query.filter_by(user_id=user_id, recipe_id=recipe_id).all()
+    assert [r.rating for r in ratings] == [2]
+
+def test_upsert_after_concurrent_insert(postgres_app):
+    recipe_id, (user_id, _) = create_recipe()
+    results = {}
+
+    # The first insert holds its transaction open, so the second statement
+    # waits on the unique index and conflicts with a row its snapshot can't see
+    assert Rating.upsert(user_id, recipe_id, 4) is None
+    second = in_app_context(postgres_app, lambda: (Rating.upsert(user_id, recipe_id, 2), db.session.commit()),
+                            results, 'second')
+    second.start()
+    time.sleep(0.5)
+    db.session.commit()
+    second.join(timeout=10)
+
+    assert results['second'][0] == 4
+    db.session.expire_all()
+    assert [r.rating for r in Rating.query.filter_by(user_id=user_id, recipe_id=recipe_id)] == [2]
+
+def test_concurrent_ratings_keep_aggregates_exact(postgres_app):
+    recipe_id, user_ids = create_recipe(rater_count=2)
+    # Login issues integer identities, which newer PyJWT rejects as a subject
+    postgres_app.config['JWT_VERIFY_SUB'] = False
+    client = postgres_app.test_client()
+    tokens = {user_id: create_access_token(identity=user_id) for user_id in user_ids}
+    barrier = threading.Barrier(4)
+    results = {}
+
+    def rate(user_id, value):
+        def post():
+            barrier.wait()
+            return client.post(f'/api/recipes/{recipe_id}/ratings', json={'rating': value},
+                               headers={'Authorization': f'Bearer {tokens[user_id]}'}).status_code
+        return post
+
+    # Two users each submit two ratings at once: one insert and one update per user
+    threads = [in_app_context(postgres_app, rate(user_id, value), results, (user_id, value))
+               for user_id in user_ids for value in (1, 5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    assert sorted(results.values()) == [200] * 4
+    db.session.expire_all()
+    ratings = Rating.query.filter_by(recipe_id=recipe_id).all()
+    recipe = db.session.get(Recipe, recipe_id)
+    assert len(ratings) == 2
+    assert recipe.rating_count == 2
+    assert recipe.rating_sum == sum(r.rating for r in ratings)
@@ -0,0 +1,50 @@
+from app import db
+from app.models import (User, Recipe, Category, Ingredient, RecipeIngredient, DietaryRestriction,
+                        Rating)
+
+# Statements allowed for GET /api/recipes/<id>: the recipe joined to its author
+# and category, then one selectin load each for ingredients and dietary restrictions
+DETAIL_QUERY_BUDGET = 3
+
+def create_recipe(ingredient_count=20, rater_count=50):
+    author = User(username='author', email='author@example.com', password_hash='x')
+    category = Category(name='Main')
+    restrictions = [DietaryRestriction(name='Vegan'), DietaryRestriction(name='Halal')]
+    ingredients = [Ingredient(name=f'ingredient {i}') for i in range(ingredient_count)]
+    raters = [User(username=f'rater{i}', email=f'rater{i}@example.com', password_hash='x')
+              for i in range(rater_count)]
+    db.session.add_all([author, category, *restrictions, *ingredients, *raters])
+    db.session.flush()
+    
+    recipe = Recipe(user_id=author.user_id, category_id=category.category_id, title='Stew',
+                    description='A stew', instructions='Simmer', dietary_restrictions=restrictions)
+    db.session.add(recipe)
+    db.session.flush()
+    db.session.add_all(RecipeIngredient(recipe_id=recipe.recipe_id, ingredient_id=ingredient.ingredient_id,
+                                        quantity=1, unit='g') for ingredient in ingredients)
+    db.session.add_all(Rating(user_id=rater.user_id, recipe_id=recipe.recipe_id, rating=4) for rater in raters)
+    Recipe.reconcile_rating_aggregates()
+    db.session.commit()
+    
+    recipe_id = recipe.recipe_id
+    # Start the request from an empty identity map
+    db.session.remove()
+    return recipe_id
+
+def test_recipe_detail_query_budget(client, count_queries):
+    recipe_id = create_recipe()
+    
+    with count_queries() as statements:
+        response = client.get(f'/api/recipes/{recipe_id}')
+    
+    assert response.status_code == 200
+    data = response.get_json()
+    assert len(data['ingredients']) == 20
+    assert len(data['dietary_restrictions']) == 2
+    assert data['ratings_count'] == 50
+    assert len(statements) <= DETAIL_QUERY_BUDGET, '\n\n'.join(statements)
+
+def test_recipe_detail_not_found(client):
+    response = client.get('/api/recipes/1')
+    
+    assert response.status_code == 404